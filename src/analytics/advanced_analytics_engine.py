@@ -14,14 +14,47 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Tuple, Optional
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
 from enum import Enum
 import json
 from collections import defaultdict, Counter
+import heapq
 import logging
 
+try:
+    import pyarrow as pa
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    pa = None
+    TEXT_DTYPE = None
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
 logger = logging.getLogger(__name__)
 
+# Identifier/label columns stored as Arrow-backed strings when pyarrow is available
+TEXT_COLUMNS = (
+    'transaction_id', 'user_id', 'merchant_id', 'device_id',
+    'ip_address', 'user_country', 'currency', 'decision',
+)
+
+# Order matches the contributing-factor masks built in analyze_denials
+CONTRIBUTING_FACTOR_LABELS = (
+    "Large transaction amount",
+    "International transaction",
+    "High ML risk score",
+    "Statistical anomaly detected",
+)
+
+# Indexed by DatetimeIndex.dayofweek (Monday=0); avoids locale-aware day_name()
+DAY_NAMES = np.array(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"], dtype=object)
+
+# Indexed by the 0/1/2 codes produced when bucketing risk-signal values
+SIGNAL_SEVERITY_LABELS = np.array(["low", "medium", "high"])
+
 
 class DenialReason(Enum):
     """Comprehensive denial reason codes"""
@@ -39,7 +72,35 @@ class DenialReason(Enum):
     MANUAL_REVIEW = "manual_review"
 
 
-@dataclass
+# Indexed by the reason codes from _determine_denial_reasons; codes 0-1 are list matches
+DENIAL_REASON_LABELS = np.array([
+    DenialReason.SANCTIONS_MATCH.value,
+    DenialReason.PEP_MATCH.value,
+    DenialReason.HIGH_RISK_SCORE.value,
+    DenialReason.FRAUD_PATTERN_DETECTED.value,
+])
+
+# Indexed by the 0-3 codes produced by _determine_severity
+DENIAL_SEVERITY_LABELS = np.array(["low", "medium", "high", "critical"])
+
+# Indexed by the 0-4 codes produced by _get_recommended_action
+RECOMMENDED_ACTIONS = np.array([
+    "Flag for investigation but may proceed with additional verification",
+    "Send to manual review queue",
+    "Block transaction and request customer verification",
+    "Enhanced due diligence required - PEP identified",
+    "Contact compliance team immediately - potential sanctions violation",
+])
+
+# Indexed by the 0-2 codes produced by _check_override_possibility
+OVERRIDE_CONDITION_SETS = (
+    (),
+    ("Manual review by compliance officer", "Customer verification call"),
+    ("Manual review by compliance officer", "Customer verification call", "3D Secure authentication required"),
+)
+
+
+@dataclass(slots=True)
 class DenialAnalysis:
     """Detailed analysis of a denied transaction"""
     transaction_id: str
@@ -57,7 +118,7 @@ class DenialAnalysis:
     severity_level: str = "high"
 
 
-@dataclass
+@dataclass(slots=True)
 class TransactionMetrics:
     """Real-time transaction metrics"""
     total_transactions: int = 0
@@ -75,8 +136,27 @@ class TransactionMetrics:
     max_risk_score: float = 0.0
     processing_time_ms: float = 0.0
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict of all fields (cheaper than dataclasses.asdict)"""
+        return {
+            "total_transactions": self.total_transactions,
+            "approved_count": self.approved_count,
+            "denied_count": self.denied_count,
+            "review_count": self.review_count,
+            "approval_rate": self.approval_rate,
+            "denial_rate": self.denial_rate,
+            "review_rate": self.review_rate,
+            "avg_transaction_amount": self.avg_transaction_amount,
+            "total_volume": self.total_volume,
+            "avg_risk_score": self.avg_risk_score,
+            "p95_risk_score": self.p95_risk_score,
+            "p99_risk_score": self.p99_risk_score,
+            "max_risk_score": self.max_risk_score,
+            "processing_time_ms": self.processing_time_ms,
+        }
+
 
-@dataclass
+@dataclass(slots=True)
 class CustomerProfile:
     """Comprehensive customer behavioral profile"""
     customer_id: str
@@ -93,26 +173,122 @@ class CustomerProfile:
     devices_used: List[str] = field(default_factory=list)
     countries_used: List[str] = field(default_factory=list)
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict of all fields (cheaper than dataclasses.asdict)"""
+        return {
+            "customer_id": self.customer_id,
+            "total_transactions": self.total_transactions,
+            "approved_transactions": self.approved_transactions,
+            "denied_transactions": self.denied_transactions,
+            "review_transactions": self.review_transactions,
+            "total_spend": self.total_spend,
+            "avg_transaction_amount": self.avg_transaction_amount,
+            "std_dev_amount": self.std_dev_amount,
+            "denial_rate": self.denial_rate,
+            "avg_risk_score": self.avg_risk_score,
+            "is_high_risk": self.is_high_risk,
+            "devices_used": list(self.devices_used),
+            "countries_used": list(self.countries_used),
+        }
+
 
 class AdvancedAnalyticsEngine:
     """Enterprise-grade analytics with comprehensive insights"""
 
-    def __init__(self):
+    def __init__(self, engine: str = "pandas"):
+        if engine not in ("pandas", "polars"):
+            raise ValueError(f"Unsupported analytics engine: {engine}")
+        if engine == "polars" and pl is None:
+            raise ValueError("polars not installed. Install with: pip install polars")
+
+        self.engine = engine
         self.transactions = []
         self.df = None
+        self.pl_df = None
+        self._table = None
         self.denial_analyses: Dict[str, DenialAnalysis] = {}
         self.customer_profiles: Dict[str, CustomerProfile] = {}
         self.metrics = TransactionMetrics()
         self.patterns = defaultdict(int)
         self.denial_reasons_dist = Counter()
+        self._sanctions_mask = np.zeros(0, dtype=bool)
+        self._pep_mask = np.zeros(0, dtype=bool)
+        self._anomaly_mask = np.zeros(0, dtype=bool)
+        self._denied_idx = np.zeros(0, dtype=np.intp)
+        self._user_txn_index: Dict[Any, List[str]] = {}
+        self._user_stats: Optional[pd.DataFrame] = None
+        self._user_history: Dict[Any, Dict[str, Any]] = {}
+        self._decision_counts: Dict[str, int] = {}
+        self._denial_risk_sum = 0.0
+        self._denial_explain_sum = 0.0
+        self._override_eligible_count = 0
+        # Leading rows of df whose denials are already in denial_analyses
+        self._analyzed_rows = 0
 
     def load_transactions(self, transactions: List[Dict[str, Any]]) -> None:
         """Load and prepare transaction data"""
         self.transactions = transactions
-        self.df = pd.DataFrame(transactions)
+        self._table = None
+        # Reloaded rows may carry new values for known ids; analyze them all again
+        self._analyzed_rows = 0
+        self._prepare_frame(pd.DataFrame(transactions))
+
+    def append_transactions(self, transactions: List[Dict[str, Any]]) -> None:
+        """Add a batch to the loaded transactions without re-parsing earlier rows
+
+        With pyarrow available the rows are kept in an Arrow table, so each
+        append converts only the new dicts. Existing denial analyses are kept
+        and analyze_denials picks up just the new denials.
+        """
+        if not transactions:
+            return
+        self.transactions = list(self.transactions) + list(transactions)
+
+        if pa is None:
+            self._prepare_frame(pd.DataFrame(self.transactions))
+            return
+
+        try:
+            if self._table is None:
+                self._table = self._to_arrow_table(self.transactions)
+            else:
+                self._table = pa.concat_tables(
+                    [self._table, self._to_arrow_table(transactions)], promote_options="default"
+                )
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type columns cannot be held in one Arrow column; rebuild in pandas
+            self._table = None
+            self._prepare_frame(pd.DataFrame(self.transactions))
+            return
+
+        self._prepare_frame(self._table.to_pandas())
+
+    @staticmethod
+    def _to_arrow_table(transactions: List[Dict[str, Any]]) -> "pa.Table":
+        """Arrow table over the union of keys (from_pylist would only use the first row's)"""
+        return pa.Table.from_struct_array(pa.array(transactions))
+
+    def _prepare_frame(self, df: pd.DataFrame) -> None:
+        """Enrich a freshly built frame and recompute the batch metrics"""
+        self.df = df
+        self._convert_text_columns()
+        self._user_stats = None
+        self._user_history = {}
+        self._denied_idx = np.zeros(0, dtype=np.intp)
         self._enrich_data()
+        if self.engine == "polars":
+            self.pl_df = self._build_polars_frame(self.transactions)
         self._compute_metrics()
 
+    def _convert_text_columns(self) -> None:
+        """Store identifier/label columns as contiguous Arrow strings instead of Python objects"""
+        if TEXT_DTYPE is None:
+            return
+
+        for col in TEXT_COLUMNS:
+            if col in self.df.columns and pd.api.types.is_object_dtype(self.df[col]):
+                self.df[col] = self.df[col].astype(TEXT_DTYPE)
+
     def _enrich_data(self) -> None:
         """Add derived features and enrichments"""
         if self.df.empty:
@@ -123,13 +299,101 @@ class AdvancedAnalyticsEngine:
         else:
             self.df['timestamp'] = datetime.utcnow()
 
-        self.df['hour'] = self.df['timestamp'].dt.hour
-        self.df['day_of_week'] = self.df['timestamp'].dt.day_name()
-        self.df['amount_log'] = np.log1p(pd.to_numeric(self.df['amount'], errors='coerce'))
+        self._build_keyword_masks()
 
-        self.df['is_denied'] = self.df['decision'].str.lower() == 'block'
-        self.df['is_approved'] = self.df['decision'].str.lower() == 'allow'
-        self.df['is_review'] = self.df['decision'].str.lower() == 'review'
+        # Parse numeric columns once; every aggregate below reads these typed copies
+        self.df['amount_f64'] = pd.to_numeric(self.df['amount'], errors='coerce').astype('float64')
+        if 'risk_score' in self.df.columns:
+            self.df['risk_score_f64'] = pd.to_numeric(self.df['risk_score'], errors='coerce').astype('float64')
+        else:
+            self.df['risk_score_f64'] = 0.0
+
+        # Lower-case once, then derive the decision flags from the integer category codes
+        decisions = self.df['decision'].str.lower().astype('category')
+        self._decision_counts = decisions.value_counts().to_dict()
+        decision_codes = decisions.cat.codes.to_numpy()
+        categories = decisions.cat.categories
+        for column, label in (('is_denied', 'block'), ('is_approved', 'allow'), ('is_review', 'review')):
+            if label in categories:
+                self.df[column] = decision_codes == categories.get_loc(label)
+            else:
+                self.df[column] = False
+        self._denied_idx = np.flatnonzero(self.df['is_denied'].to_numpy(dtype=bool))
+
+        self._build_user_txn_index()
+
+    def add_derived_features(self) -> pd.DataFrame:
+        """Add hour, day_of_week and amount_log columns on demand
+
+        None of the built-in analyses read these, so they are no longer
+        computed on every load; call this before using them.
+        """
+        if self.df is None or self.df.empty or 'amount_log' in self.df.columns:
+            return self.df
+
+        timestamps = pd.DatetimeIndex(self.df['timestamp'])
+        self.df['hour'] = timestamps.hour.to_numpy()
+        day_codes = timestamps.dayofweek.to_numpy()
+        if timestamps.hasnans:
+            day_names = np.full(len(day_codes), np.nan, dtype=object)
+            valid = ~np.isnan(day_codes)
+            day_names[valid] = DAY_NAMES[day_codes[valid].astype(np.intp)]
+        else:
+            day_names = DAY_NAMES[day_codes]
+        self.df['day_of_week'] = day_names
+        self.df['amount_log'] = np.log1p(self.df['amount_f64'])
+
+        return self.df
+
+    def _build_user_txn_index(self) -> None:
+        """Map each user to their first five transaction ids"""
+        if 'user_id' not in self.df.columns or 'transaction_id' not in self.df.columns:
+            self._user_txn_index = {}
+            return
+
+        first_txns = self.df.groupby('user_id', sort=False).head(5)
+        self._user_txn_index = (
+            first_txns.groupby('user_id', sort=False)['transaction_id'].agg(list).to_dict()
+        )
+
+    def _build_keyword_masks(self) -> None:
+        """Screen free-text fields once for sanctions/PEP/anomaly hints"""
+        text_cols = [
+            col for col in self.df.columns
+            if not pd.api.types.is_numeric_dtype(self.df[col])
+            and not pd.api.types.is_datetime64_any_dtype(self.df[col])
+        ]
+        if not text_cols:
+            self._sanctions_mask = self._pep_mask = self._anomaly_mask = np.zeros(len(self.df), dtype=bool)
+            return
+
+        combined = self.df[text_cols[0]].astype(str).str.cat(
+            [self.df[col].astype(str) for col in text_cols[1:]], sep=' ', na_rep=''
+        ).str.lower()
+
+        self._sanctions_mask = combined.str.contains('sanctions', regex=False).to_numpy(dtype=bool)
+        self._pep_mask = combined.str.contains('pep', regex=False).to_numpy(dtype=bool)
+        self._anomaly_mask = combined.str.contains('anomaly', regex=False).to_numpy(dtype=bool)
+
+    def _build_polars_frame(self, transactions: List[Dict[str, Any]]) -> "pl.DataFrame":
+        """Columnar copy used by the polars engine for metric and per-user aggregation"""
+        frame = pl.from_dicts(transactions, infer_schema_length=None)
+        if frame.is_empty():
+            return frame
+
+        if 'risk_score' in frame.columns:
+            risk_score = pl.col('risk_score').cast(pl.Float64, strict=False).fill_nan(None)
+        else:
+            risk_score = pl.lit(0.0)
+        decision = pl.col('decision').cast(pl.Utf8).str.to_lowercase()
+
+        return frame.with_columns(
+            amount_f64=pl.col('amount').cast(pl.Float64, strict=False).fill_nan(None),
+            risk_score_f64=risk_score,
+            is_denied=(decision == 'block').fill_null(False),
+            is_approved=(decision == 'allow').fill_null(False),
+            is_review=(decision == 'review').fill_null(False),
+        )
 
     def _compute_metrics(self) -> None:
         """Compute real-time transaction metrics"""
@@ -138,210 +402,303 @@ class AdvancedAnalyticsEngine:
 
         n = len(self.df)
         self.metrics.total_transactions = n
-        self.metrics.approved_count = int(self.df['is_approved'].sum())
-        self.metrics.denied_count = int(self.df['is_denied'].sum())
-        self.metrics.review_count = int(self.df['is_review'].sum())
+
+        if self.engine == "polars":
+            self._compute_metrics_polars()
+        else:
+            # Counted once from the categorical decision column in _enrich_data
+            self.metrics.approved_count = int(self._decision_counts.get('allow', 0))
+            self.metrics.denied_count = int(self._decision_counts.get('block', 0))
+            self.metrics.review_count = int(self._decision_counts.get('review', 0))
+
+            self.metrics.avg_transaction_amount = float(self.df['amount_f64'].mean())
+            self.metrics.total_volume = float(self.df['amount_f64'].sum())
+
+            if 'risk_score' in self.df.columns:
+                risk_scores = self.df['risk_score_f64'].to_numpy()
+                risk_scores = risk_scores[~np.isnan(risk_scores)]
+                if risk_scores.size:
+                    # Both quantiles from one partition instead of two quantile() calls
+                    p95, p99 = np.percentile(risk_scores, [95, 99])
+                    self.metrics.avg_risk_score = float(risk_scores.mean())
+                    self.metrics.p95_risk_score = float(p95)
+                    self.metrics.p99_risk_score = float(p99)
+                    self.metrics.max_risk_score = float(risk_scores.max())
+                else:
+                    self.metrics.avg_risk_score = float('nan')
+                    self.metrics.p95_risk_score = float('nan')
+                    self.metrics.p99_risk_score = float('nan')
+                    self.metrics.max_risk_score = float('nan')
 
         self.metrics.approval_rate = (self.metrics.approved_count / n * 100) if n > 0 else 0.0
         self.metrics.denial_rate = (self.metrics.denied_count / n * 100) if n > 0 else 0.0
         self.metrics.review_rate = (self.metrics.review_count / n * 100) if n > 0 else 0.0
 
-        self.metrics.avg_transaction_amount = float(pd.to_numeric(self.df['amount'], errors='coerce').mean())
-        self.metrics.total_volume = float(pd.to_numeric(self.df['amount'], errors='coerce').sum())
-
-        if 'risk_score' in self.df.columns:
-            risk_scores = pd.to_numeric(self.df['risk_score'], errors='coerce')
-            self.metrics.avg_risk_score = float(risk_scores.mean())
-            self.metrics.p95_risk_score = float(risk_scores.quantile(0.95))
-            self.metrics.p99_risk_score = float(risk_scores.quantile(0.99))
-            self.metrics.max_risk_score = float(risk_scores.max())
-
-    def analyze_denials(self) -> Dict[str, DenialAnalysis]:
-        """Comprehensive analysis of denied transactions"""
-        if self.df.empty:
-            return {}
-
-        denied_txns = self.df[self.df['is_denied']]
-
-        for idx, txn in denied_txns.iterrows():
-            analysis = self._analyze_single_denial(txn)
-            self.denial_analyses[txn.get('transaction_id', str(idx))] = analysis
-            self.denial_reasons_dist[analysis.primary_reason] += 1
-
-        return self.denial_analyses
-
-    def _analyze_single_denial(self, txn: pd.Series) -> DenialAnalysis:
-        """Analyze a single denied transaction"""
-        txn_id = str(txn.get('transaction_id', 'unknown'))
-        risk_score = float(txn.get('risk_score', 0.0))
-
-        primary_reason = self._determine_denial_reason(txn)
-        contributing_factors = self._identify_contributing_factors(txn)
-        risk_signals = self._extract_risk_signals(txn)
-        related = self._find_related_transactions(txn)
-        customer_hist = self._get_customer_history(txn.get('user_id'))
-        can_override, conditions = self._check_override_possibility(txn, contributing_factors)
-        recommended = self._get_recommended_action(primary_reason, risk_score)
-        explainability = self._calculate_explainability(primary_reason, contributing_factors)
-        severity = self._determine_severity(risk_score, primary_reason)
-
-        return DenialAnalysis(
-            transaction_id=txn_id,
-            primary_reason=primary_reason,
-            risk_score=risk_score,
-            confidence_score=float(txn.get('confidence_score', 0.85)),
-            contributing_factors=contributing_factors,
-            risk_signals=risk_signals,
-            recommended_action=recommended,
-            can_override=can_override,
-            override_conditions=conditions,
-            related_transactions=related,
-            customer_history=customer_hist,
-            explainability_score=explainability,
-            severity_level=severity
+    def _compute_metrics_polars(self) -> None:
+        """Counts and amount/risk statistics in a single polars select"""
+        amount = pl.col('amount_f64')
+        risk = pl.col('risk_score_f64')
+        stats = self.pl_df.select(
+            approved=pl.col('is_approved').sum(),
+            denied=pl.col('is_denied').sum(),
+            review=pl.col('is_review').sum(),
+            avg_amount=amount.mean(),
+            total_volume=amount.sum(),
+            avg_risk=risk.mean(),
+            p95_risk=risk.quantile(0.95, interpolation='linear'),
+            p99_risk=risk.quantile(0.99, interpolation='linear'),
+            max_risk=risk.max(),
+        ).fill_null(float('nan')).row(0, named=True)
+
+        self.metrics.approved_count = int(stats['approved'])
+        self.metrics.denied_count = int(stats['denied'])
+        self.metrics.review_count = int(stats['review'])
+        self.metrics.avg_transaction_amount = float(stats['avg_amount'])
+        self.metrics.total_volume = float(stats['total_volume'])
+
+        if 'risk_score' in self.pl_df.columns:
+            self.metrics.avg_risk_score = float(stats['avg_risk'])
+            self.metrics.p95_risk_score = float(stats['p95_risk'])
+            self.metrics.p99_risk_score = float(stats['p99_risk'])
+            self.metrics.max_risk_score = float(stats['max_risk'])
+
+    def analyze_denials(self, force: bool = False) -> Dict[str, DenialAnalysis]:
+        """Comprehensive analysis of denied transactions
+
+        Denials in rows analyzed since the last load_transactions are skipped, so
+        after append_transactions only the appended rows are analyzed; pass
+        ``force=True`` to discard previous results and analyze everything again.
+        """
+        if force:
+            self._reset_denials()
+
+        has_txn_ids = 'transaction_id' in self.df.columns
+        denied_idx = self._denied_idx[self._denied_idx >= self._analyzed_rows]
+        self._analyzed_rows = len(self.df)
+
+        if not len(denied_idx):
+            return self.denial_analyses
+
+        # Work on positional slices of the typed columns; no denied sub-frame is materialized
+        amounts = self.df['amount_f64'].to_numpy()[denied_idx]
+        risk_scores = self.df['risk_score_f64'].to_numpy()[denied_idx]
+
+        reason_codes = self._determine_denial_reasons(
+            self._sanctions_mask[denied_idx], self._pep_mask[denied_idx], risk_scores
         )
+        reasons = DENIAL_REASON_LABELS[reason_codes]
+        factors = self._identify_contributing_factors(
+            denied_idx, amounts, risk_scores, self._anomaly_mask[denied_idx]
+        )
+        signals = self._extract_risk_signals(amounts, risk_scores)
+        factor_counts = np.fromiter(map(len, factors), dtype=np.int64, count=len(factors))
+        explainability = self._calculate_explainability(reason_codes, factor_counts)
+        severities = self._determine_severity(risk_scores, reason_codes)
+        actions = self._get_recommended_action(reason_codes, risk_scores)
+        can_override, condition_codes = self._check_override_possibility(risk_scores)
+
+        if has_txn_ids:
+            keys = self.df['transaction_id'].iloc[denied_idx].tolist()
+            txn_ids = [str(k) for k in keys]
+        else:
+            keys = [str(idx) for idx in self.df.index[denied_idx]]
+            txn_ids = ['unknown'] * len(keys)
 
-    def _determine_denial_reason(self, txn: pd.Series) -> str:
-        """Determine primary reason for denial"""
-        risk_score = float(txn.get('risk_score', 0.0))
-
-        if 'sanctions' in str(txn).lower():
-            return DenialReason.SANCTIONS_MATCH.value
-        if 'pep' in str(txn).lower():
-            return DenialReason.PEP_MATCH.value
-        if risk_score > 0.85:
-            return DenialReason.HIGH_RISK_SCORE.value
-
-        return DenialReason.FRAUD_PATTERN_DETECTED.value
-
-    def _identify_contributing_factors(self, txn: pd.Series) -> List[str]:
-        """Identify all factors contributing to denial"""
-        factors = []
-
-        amount = float(txn.get('amount', 0))
-        if amount > 5000:
-            factors.append("Large transaction amount")
+        if 'user_id' in self.df.columns:
+            user_ids = self.df['user_id'].iloc[denied_idx].tolist()
+        else:
+            user_ids = [None] * len(keys)
+        if 'confidence_score' in self.df.columns:
+            confidences = pd.to_numeric(
+                self.df['confidence_score'].iloc[denied_idx], errors='coerce'
+            ).to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            confidences = np.full(len(keys), 0.85)
+
+        if not self._user_history and 'user_id' in self.df.columns:
+            self._user_history = self._build_user_history()
+
+        # Only dataclass construction remains per-row; all scoring above is column-wise
+        for (key, txn_id, user_id, reason, risk_score, confidence, txn_factors, txn_signals,
+             explainability_score, severity, action, overridable, condition_code) in zip(
+            keys, txn_ids, user_ids, reasons.tolist(), risk_scores.tolist(), confidences.tolist(),
+            factors, signals, explainability.tolist(), severities.tolist(), actions.tolist(),
+            can_override.tolist(), condition_codes.tolist()
+        ):
+            analysis = DenialAnalysis(
+                transaction_id=txn_id,
+                primary_reason=reason,
+                risk_score=risk_score,
+                confidence_score=confidence,
+                contributing_factors=txn_factors,
+                risk_signals=txn_signals,
+                recommended_action=action,
+                can_override=overridable,
+                override_conditions=list(OVERRIDE_CONDITION_SETS[condition_code]),
+                related_transactions=self._find_related_transactions(user_id),
+                customer_history=self._get_customer_history(user_id),
+                explainability_score=explainability_score,
+                severity_level=severity
+            )
+            self._record_denial(key, analysis)
+
+        # Whole-batch reason histogram in one C call rather than a Counter bump per row
+        reason_counts = np.bincount(reason_codes, minlength=len(DENIAL_REASON_LABELS))
+        self.denial_reasons_dist.update({
+            label: count
+            for label, count in zip(DENIAL_REASON_LABELS.tolist(), reason_counts.tolist())
+            if count
+        })
 
-        if str(txn.get('user_country', '')).lower() != 'us':
-            factors.append("International transaction")
+        return self.denial_analyses
 
-        if float(txn.get('risk_score', 0)) > 0.7:
-            factors.append("High ML risk score")
+    def _reset_denials(self) -> None:
+        """Drop stored denial analyses together with their running totals"""
+        self.denial_analyses = {}
+        self.denial_reasons_dist = Counter()
+        self._denial_risk_sum = 0.0
+        self._denial_explain_sum = 0.0
+        self._override_eligible_count = 0
+        self._analyzed_rows = 0
+
+    def _record_denial(self, key: str, analysis: DenialAnalysis) -> None:
+        """Store an analysis and keep the summary running totals in step
+
+        The reason distribution for new analyses is added per batch by
+        analyze_denials; only a replaced analysis is taken back out here.
+        """
+        previous = self.denial_analyses.get(key)
+        if previous is not None:
+            self.denial_reasons_dist[previous.primary_reason] -= 1
+            if not self.denial_reasons_dist[previous.primary_reason]:
+                del self.denial_reasons_dist[previous.primary_reason]
+            self._denial_risk_sum -= previous.risk_score
+            self._denial_explain_sum -= previous.explainability_score
+            self._override_eligible_count -= previous.can_override
+
+        self.denial_analyses[key] = analysis
+        self._denial_risk_sum += analysis.risk_score
+        self._denial_explain_sum += analysis.explainability_score
+        self._override_eligible_count += analysis.can_override
+
+    def _determine_denial_reasons(self, sanctions_mask: np.ndarray, pep_mask: np.ndarray,
+                                  risk_scores: np.ndarray) -> np.ndarray:
+        """Determine primary reason code for each denial (see DENIAL_REASON_LABELS)"""
+        return np.select([sanctions_mask, pep_mask, risk_scores > 0.85], [0, 1, 2], 3)
+
+    def _identify_contributing_factors(self, denied_idx: np.ndarray, amounts: np.ndarray,
+                                       risk_scores: np.ndarray, anomaly_mask: np.ndarray) -> List[List[str]]:
+        """Identify all factors contributing to each denial"""
+        if 'user_country' in self.df.columns:
+            countries = self.df['user_country'].iloc[denied_idx].astype(str).str.lower().to_numpy()
+        else:
+            countries = np.full(len(denied_idx), '')
 
-        if 'anomaly' in str(txn).lower():
-            factors.append("Statistical anomaly detected")
+        factor_masks = np.column_stack([
+            amounts > 5000,
+            countries != 'us',
+            risk_scores > 0.7,
+            anomaly_mask,
+        ])
 
-        return factors
+        return [
+            [label for label, hit in zip(CONTRIBUTING_FACTOR_LABELS, row) if hit]
+            for row in factor_masks.tolist()
+        ]
 
-    def _extract_risk_signals(self, txn: pd.Series) -> List[Dict[str, Any]]:
+    def _extract_risk_signals(self, amounts: np.ndarray, risk_scores: np.ndarray) -> List[List[Dict[str, Any]]]:
         """Extract detailed risk signals"""
-        signals = []
-
-        amount = float(txn.get('amount', 0))
-        signals.append({
-            "signal": "transaction_amount",
-            "value": amount,
-            "severity": "high" if amount > 5000 else "medium" if amount > 1000 else "low",
-            "description": f"Transaction amount of ${amount:,.2f}"
-        })
-
-        risk = float(txn.get('risk_score', 0))
-        signals.append({
-            "signal": "risk_score",
-            "value": risk,
-            "severity": "high" if risk > 0.7 else "medium" if risk > 0.4 else "low",
-            "description": f"ML model risk assessment: {risk:.1%}"
-        })
-
-        return signals
+        amount_severity = SIGNAL_SEVERITY_LABELS[np.select([amounts > 5000, amounts > 1000], [2, 1], 0)]
+        risk_severity = SIGNAL_SEVERITY_LABELS[np.select([risk_scores > 0.7, risk_scores > 0.4], [2, 1], 0)]
+
+        amount_values = amounts.tolist()
+        risk_values = risk_scores.tolist()
+        amount_descriptions = map("Transaction amount of ${:,.2f}".format, amount_values)
+        risk_descriptions = map("ML model risk assessment: {:.1%}".format, risk_values)
+
+        return [
+            [
+                {"signal": "transaction_amount", "value": amount, "severity": amount_sev, "description": amount_desc},
+                {"signal": "risk_score", "value": risk, "severity": risk_sev, "description": risk_desc},
+            ]
+            for amount, risk, amount_sev, risk_sev, amount_desc, risk_desc in zip(
+                amount_values, risk_values, amount_severity.tolist(), risk_severity.tolist(),
+                amount_descriptions, risk_descriptions
+            )
+        ]
 
-    def _find_related_transactions(self, txn: pd.Series) -> List[str]:
+    def _find_related_transactions(self, user_id: Optional[str]) -> List[str]:
         """Find related transactions"""
-        related = []
-
-        user_id = txn.get('user_id')
-        if user_id and not self.df.empty:
-            user_txns = self.df[self.df.get('user_id') == user_id]
-            related = user_txns['transaction_id'].head(5).tolist() if 'transaction_id' in user_txns else []
+        if pd.isna(user_id):
+            return []
 
-        return related
+        return list(self._user_txn_index.get(user_id, []))
 
     def _get_customer_history(self, user_id: Optional[str]) -> Dict[str, Any]:
         """Get customer's historical profile"""
-        if not user_id or self.df.empty:
+        if pd.isna(user_id) or not user_id:
             return {}
 
-        user_txns = self.df[self.df.get('user_id') == user_id]
+        return dict(self._user_history.get(user_id, {}))
+
+    def _build_user_history(self) -> Dict[Any, Dict[str, Any]]:
+        """Customer-history snapshots for every user, from the shared per-user aggregate"""
+        user_stats = self._aggregate_by_user()
 
         return {
-            "total_transactions": len(user_txns),
-            "total_approved": int(user_txns['is_approved'].sum()) if 'is_approved' in user_txns else 0,
-            "total_denied": int(user_txns['is_denied'].sum()) if 'is_denied' in user_txns else 0,
-            "denial_rate": float((user_txns['is_denied'].sum() / len(user_txns) * 100)) if len(user_txns) > 0 else 0.0,
-            "avg_amount": float(pd.to_numeric(user_txns['amount'], errors='coerce').mean()) if 'amount' in user_txns else 0.0,
+            user_id: {
+                "total_transactions": total,
+                "total_approved": approved,
+                "total_denied": denied,
+                "denial_rate": denial_rate,
+                "avg_amount": avg_amount,
+            }
+            for user_id, total, approved, denied, denial_rate, avg_amount in zip(
+                user_stats.index,
+                user_stats['total_transactions'].astype(int).tolist(),
+                user_stats['approved_transactions'].astype(int).tolist(),
+                user_stats['denied_transactions'].astype(int).tolist(),
+                user_stats['denial_rate'].astype(float).tolist(),
+                user_stats['avg_transaction_amount'].astype(float).tolist(),
+            )
         }
 
-    def _check_override_possibility(self, txn: pd.Series, factors: List[str]) -> Tuple[bool, List[str]]:
-        """Check if transaction can be overridden"""
-        risk_score = float(txn.get('risk_score', 0))
-
-        can_override = risk_score < 0.95
-
-        conditions = []
-        if can_override:
-            conditions.append("Manual review by compliance officer")
-            conditions.append("Customer verification call")
-            if risk_score > 0.7:
-                conditions.append("3D Secure authentication required")
-
-        return can_override, conditions
-
-    def _get_recommended_action(self, reason: str, risk_score: float) -> str:
-        """Get recommended action for denial"""
-        if reason == DenialReason.SANCTIONS_MATCH.value:
-            return "Contact compliance team immediately - potential sanctions violation"
-        elif reason == DenialReason.PEP_MATCH.value:
-            return "Enhanced due diligence required - PEP identified"
-        elif risk_score > 0.85:
-            return "Block transaction and request customer verification"
-        elif risk_score > 0.7:
-            return "Send to manual review queue"
-        else:
-            return "Flag for investigation but may proceed with additional verification"
-
-    def _calculate_explainability(self, reason: str, factors: List[str]) -> float:
-        """Calculate how explainable the denial is (0-1)"""
-        base_score = 0.8
-
-        if reason in [DenialReason.SANCTIONS_MATCH.value, DenialReason.PEP_MATCH.value]:
-            base_score = 0.95
-
-        base_score += len(factors) * 0.05
+    def _check_override_possibility(self, risk_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Check which transactions can be overridden and under which conditions"""
+        can_override = risk_scores < 0.95
+        condition_codes = np.select([can_override & (risk_scores > 0.7), can_override], [2, 1], 0)
+        return can_override, condition_codes
+
+    def _get_recommended_action(self, reason_codes: np.ndarray, risk_scores: np.ndarray) -> np.ndarray:
+        """Get recommended action for each denial"""
+        action_codes = np.select(
+            [reason_codes == 0, reason_codes == 1, risk_scores > 0.85, risk_scores > 0.7],
+            [4, 3, 2, 1],
+            0,
+        )
+        return RECOMMENDED_ACTIONS[action_codes]
 
-        return min(1.0, base_score)
+    def _calculate_explainability(self, reason_codes: np.ndarray, factor_counts: np.ndarray) -> np.ndarray:
+        """Calculate how explainable each denial is (0-1)"""
+        base_scores = np.where(reason_codes <= 1, 0.95, 0.8)
+        return np.minimum(1.0, base_scores + factor_counts * 0.05)
 
-    def _determine_severity(self, risk_score: float, reason: str) -> str:
-        """Determine severity level of denial"""
-        if reason in [DenialReason.SANCTIONS_MATCH.value, DenialReason.PEP_MATCH.value]:
-            return "critical"
-        elif risk_score > 0.85:
-            return "high"
-        elif risk_score > 0.6:
-            return "medium"
-        else:
-            return "low"
+    def _determine_severity(self, risk_scores: np.ndarray, reason_codes: np.ndarray) -> np.ndarray:
+        """Determine severity level of each denial"""
+        severity_codes = np.select([reason_codes <= 1, risk_scores > 0.85, risk_scores > 0.6], [3, 2, 1], 0)
+        return DENIAL_SEVERITY_LABELS[severity_codes]
 
     def get_metrics_summary(self) -> Dict[str, Any]:
         """Get comprehensive metrics summary"""
-        return asdict(self.metrics)
+        return self.metrics.to_dict()
 
     def get_denial_summary(self) -> Dict[str, Any]:
         """Get denial analysis summary"""
         return {
             "total_denials": len(self.denial_analyses),
             "denial_reasons_distribution": dict(self.denial_reasons_dist),
-            "avg_risk_score_denied": float(np.mean([d.risk_score for d in self.denial_analyses.values()])) if self.denial_analyses else 0.0,
-            "override_eligible": sum(1 for d in self.denial_analyses.values() if d.can_override),
+            "avg_risk_score_denied": self._denial_risk_sum / len(self.denial_analyses) if self.denial_analyses else 0.0,
+            "override_eligible": self._override_eligible_count,
         }
 
     def get_customer_analytics(self) -> Dict[str, CustomerProfile]:
@@ -349,48 +706,89 @@ class AdvancedAnalyticsEngine:
         if self.df.empty:
             return {}
 
-        for user_id in self.df['user_id'].unique():
-            if pd.isna(user_id):
-                continue
-
-            user_txns = self.df[self.df['user_id'] == user_id]
-
-            profile = CustomerProfile(
-                customer_id=str(user_id),
-                total_transactions=len(user_txns),
-                approved_transactions=int(user_txns['is_approved'].sum()),
-                denied_transactions=int(user_txns['is_denied'].sum()),
-                review_transactions=int(user_txns['is_review'].sum()),
-                total_spend=float(pd.to_numeric(user_txns['amount'], errors='coerce').sum()),
-                avg_transaction_amount=float(pd.to_numeric(user_txns['amount'], errors='coerce').mean()),
-                std_dev_amount=float(pd.to_numeric(user_txns['amount'], errors='coerce').std()),
-                denial_rate=float((user_txns['is_denied'].sum() / len(user_txns) * 100)) if len(user_txns) > 0 else 0.0,
-                avg_risk_score=float(pd.to_numeric(user_txns.get('risk_score', 0), errors='coerce').mean()),
-                is_high_risk=bool(pd.to_numeric(user_txns.get('risk_score', 0), errors='coerce').mean() > 0.7),
+        user_stats = self._aggregate_by_user()
+
+        for row in user_stats.itertuples():
+            customer_id = str(row.Index)
+            self.customer_profiles[customer_id] = CustomerProfile(
+                customer_id=customer_id,
+                total_transactions=int(row.total_transactions),
+                approved_transactions=int(row.approved_transactions),
+                denied_transactions=int(row.denied_transactions),
+                review_transactions=int(row.review_transactions),
+                total_spend=float(row.total_spend),
+                avg_transaction_amount=float(row.avg_transaction_amount),
+                std_dev_amount=float(row.std_dev_amount),
+                denial_rate=float(row.denial_rate),
+                avg_risk_score=float(row.avg_risk_score),
+                is_high_risk=bool(row.is_high_risk),
             )
 
-            self.customer_profiles[str(user_id)] = profile
-
         return self.customer_profiles
 
+    def _aggregate_by_user(self) -> pd.DataFrame:
+        """Per-user aggregates computed in a single groupby pass (cached per load)"""
+        if self._user_stats is not None:
+            return self._user_stats
+
+        if self.engine == "polars":
+            user_stats = self._aggregate_by_user_polars()
+        else:
+            user_stats = self.df.groupby('user_id', sort=False).agg(
+                total_transactions=('amount_f64', 'size'),
+                total_spend=('amount_f64', 'sum'),
+                avg_transaction_amount=('amount_f64', 'mean'),
+                std_dev_amount=('amount_f64', 'std'),
+                approved_transactions=('is_approved', 'sum'),
+                denied_transactions=('is_denied', 'sum'),
+                review_transactions=('is_review', 'sum'),
+                avg_risk_score=('risk_score_f64', 'mean'),
+            )
+        user_stats['denial_rate'] = user_stats['denied_transactions'] / user_stats['total_transactions'] * 100
+        user_stats['is_high_risk'] = user_stats['avg_risk_score'] > 0.7
+        self._user_stats = user_stats
+        return user_stats
+
+    def _aggregate_by_user_polars(self) -> pd.DataFrame:
+        """polars group_by equivalent of the pandas per-user aggregation"""
+        amount = pl.col('amount_f64')
+        user_stats = (
+            self.pl_df.filter(pl.col('user_id').is_not_null())
+            .group_by('user_id', maintain_order=True)
+            .agg(
+                total_transactions=pl.len(),
+                total_spend=amount.sum(),
+                avg_transaction_amount=amount.mean(),
+                std_dev_amount=amount.std(),
+                approved_transactions=pl.col('is_approved').sum(),
+                denied_transactions=pl.col('is_denied').sum(),
+                review_transactions=pl.col('is_review').sum(),
+                avg_risk_score=pl.col('risk_score_f64').mean(),
+            )
+            .with_columns(pl.col(pl.Float64).fill_null(float('nan')))
+        )
+
+        # Only the small per-user result crosses back into pandas
+        return pd.DataFrame(user_stats.to_dict(as_series=False)).set_index('user_id')
+
     def get_top_risk_customers(self, top_n: int = 10) -> List[Dict[str, Any]]:
         """Get top risk customers"""
         if not self.customer_profiles:
             self.get_customer_analytics()
 
-        sorted_customers = sorted(
+        top_customers = heapq.nlargest(
+            top_n,
             self.customer_profiles.values(),
-            key=lambda x: x.avg_risk_score,
-            reverse=True
+            key=lambda x: x.avg_risk_score
         )
 
-        return [asdict(c) for c in sorted_customers[:top_n]]
+        return [c.to_dict() for c in top_customers]
 
     def get_denial_insights(self) -> Dict[str, Any]:
         """Get comprehensive denial insights"""
         return {
             "total_denials": len(self.denial_analyses),
             "reasons_breakdown": dict(self.denial_reasons_dist),
-            "override_eligible_count": sum(1 for d in self.denial_analyses.values() if d.can_override),
-            "avg_explainability": float(np.mean([d.explainability_score for d in self.denial_analyses.values()])) if self.denial_analyses else 1.0,
+            "override_eligible_count": self._override_eligible_count,
+            "avg_explainability": self._denial_explain_sum / len(self.denial_analyses) if self.denial_analyses else 1.0,
         }
@@ -14,9 +14,10 @@ Implements cutting-edge algorithms for:
 
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
-from collections import defaultdict, Counter
+from collections import defaultdict
+from itertools import chain
 import statistics
 from datetime import datetime, timedelta
 from sklearn.ensemble import IsolationForest
@@ -25,10 +26,27 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 import networkx as nx
 
+try:
+    import networkit as nk
+except ImportError:
+    nk = None
 
-@dataclass
+# Late-night / early-morning hours treated as unusual activity
+UNUSUAL_HOURS = [0, 1, 2, 3, 4, 5, 23]
+
+# High-repetition string columns stored as pandas Categorical
+CATEGORICAL_COLUMNS = ('user_id', 'merchant_id', 'device_id', 'ip_address', 'decision', 'user_country')
+
+# Indexed by the 0/1/2 codes from the final-score thresholds (< 0.3, < 0.7)
+RISK_LEVELS = np.array(['LOW', 'MEDIUM', 'HIGH'], dtype=object)
+
+# Upper bound on the large cliques reported by detect_fraud_networks
+MAX_CLIQUES = 1000
+
+
+@dataclass(slots=True, frozen=True)
 class RiskProfile:
-    """Comprehensive risk profile for an entity."""
+    """Comprehensive risk profile for an entity (immutable once scored)."""
     entity_id: str
     entity_type: str  # 'user', 'merchant', 'device'
     base_risk_score: float
@@ -46,10 +64,14 @@ class RiskProfile:
 class AdvancedFraudDetectionEngine:
     """Enterprise-grade fraud detection using multiple ML techniques."""
 
-    def __init__(self):
+    def __init__(self, n_jobs: Optional[int] = None):
+        # Worker processes for the anomaly detectors; None keeps scikit-learn's single job,
+        # which suits engines built per API request
+        self.n_jobs = n_jobs
         self.transactions = []
         self.df = None
         self.risk_profiles = {}
+        self.profile_frame = None
         self.fraud_networks = {}
         self.anomalies = []
         self.money_laundering_patterns = []
@@ -69,20 +91,29 @@ class AdvancedFraudDetectionEngine:
         self.df['amount'] = pd.to_numeric(self.df.get('amount', 0))
         self.df['risk_score'] = pd.to_numeric(self.df.get('risk_score', 0))
 
+        # Dictionary-encode entity/label columns so groupby, nunique and == compare int codes
+        for column in CATEGORICAL_COLUMNS:
+            if column in self.df.columns:
+                self.df[column] = self.df[column].astype('category')
+
         # Feature engineering
         self.df['amount_log'] = np.log1p(self.df['amount'])
-        self.df['hour'] = pd.to_datetime(self.df.get('timestamp', datetime.now()),
-                                         errors='coerce').dt.hour
-        self.df['day_of_week'] = pd.to_datetime(self.df.get('timestamp', datetime.now()),
-                                                errors='coerce').dt.dayofweek
-
-        # Aggregate statistics
-        self.df['user_transaction_count'] = self.df.groupby('user_id').size().reindex(
-            self.df['user_id']).values
-        self.df['merchant_transaction_count'] = self.df.groupby('merchant_id').size().reindex(
-            self.df['merchant_id']).values
-        self.df['device_transaction_count'] = self.df.groupby('device_id').size().reindex(
-            self.df['device_id']).values
+
+        # Parse timestamps once; downcast to the smallest int dtype when there are no NaT rows
+        if 'timestamp' in self.df.columns:
+            ts = pd.to_datetime(self.df['timestamp'], errors='coerce')
+        else:
+            ts = pd.Series(pd.Timestamp(datetime.now()), index=self.df.index)
+        self.df['hour'] = pd.to_numeric(ts.dt.hour, downcast='integer')
+        self.df['day_of_week'] = pd.to_numeric(ts.dt.dayofweek, downcast='integer')
+
+        # Aggregate statistics (group sizes broadcast back to rows in one pass)
+        for column, feature in (('user_id', 'user_transaction_count'),
+                                ('merchant_id', 'merchant_transaction_count'),
+                                ('device_id', 'device_transaction_count')):
+            if column in self.df.columns:
+                counts = self.df.groupby(column, observed=True)[column].transform('size')
+                self.df[feature] = pd.to_numeric(counts, downcast='integer')
 
     def detect_anomalies(self) -> List[Dict[str, Any]]:
         """Detect statistical anomalies using multiple methods."""
@@ -95,40 +126,63 @@ class AdvancedFraudDetectionEngine:
         features_for_if = ['amount_log', 'hour', 'user_transaction_count',
                           'merchant_transaction_count', 'device_transaction_count']
         available_features = [f for f in features_for_if if f in self.df.columns]
-
-        if available_features:
-            iso_forest = IsolationForest(contamination=0.1, random_state=42)
-            anomaly_labels = iso_forest.fit_predict(self.df[available_features].fillna(0))
-
-            iso_scores = iso_forest.score_samples(self.df[available_features].fillna(0))
-
-            for idx, (label, score) in enumerate(zip(anomaly_labels, iso_scores)):
-                if label == -1:  # Anomaly
-                    anomalies.append({
-                        'index': idx,
-                        'method': 'Isolation Forest',
-                        'anomaly_score': float(-score),
-                        'transaction_id': self.df.iloc[idx].get('transaction_id', f'txn_{idx}'),
-                        'reason': 'Statistical outlier detected'
-                    })
-
-        # 2. Local Outlier Factor
-        if len(self.df) > 5:
-            lof = LocalOutlierFactor(n_neighbors=min(5, len(self.df) - 1),
-                                     contamination=0.1)
-            lof_labels = lof.fit_predict(self.df[available_features].fillna(0))
-            lof_scores = lof.negative_outlier_factor_
-
-            for idx, (label, score) in enumerate(zip(lof_labels, lof_scores)):
-                if label == -1:
-                    if not any(a['index'] == idx for a in anomalies):  # Avoid duplicates
-                        anomalies.append({
-                            'index': idx,
-                            'method': 'Local Outlier Factor',
-                            'anomaly_score': float(abs(score)),
-                            'transaction_id': self.df.iloc[idx].get('transaction_id', f'txn_{idx}'),
-                            'reason': 'Density-based outlier detected'
-                        })
+        if not available_features:
+            self.anomalies = anomalies
+            return anomalies
+
+        # Feature matrix built once and shared by both detectors: a single row-major float32
+        # allocation filled column by column (NaN -> 0), which is what the tree splits read
+        X = np.empty((len(self.df), len(available_features)), dtype=np.float32)
+        for col_idx, feature in enumerate(available_features):
+            X[:, col_idx] = self.df[feature].to_numpy(dtype=np.float32, na_value=0)
+
+        if 'transaction_id' in self.df.columns:
+            txn_ids = self.df['transaction_id'].to_numpy()
+        else:
+            txn_ids = np.array([f'txn_{idx}' for idx in range(len(self.df))], dtype=object)
+
+        # Single pass through the trees: outliers follow from the scores (predict() uses offset_)
+        iso_forest = IsolationForest(contamination=0.1, random_state=42, n_jobs=self.n_jobs).fit(X)
+        iso_scores = iso_forest.score_samples(X)
+        iso_idx = np.flatnonzero(iso_scores < iso_forest.offset_)
+
+        anomalies.extend(
+            {
+                'index': idx,
+                'method': 'Isolation Forest',
+                'anomaly_score': -score,
+                'transaction_id': txn_id,
+                'reason': 'Statistical outlier detected'
+            }
+            for idx, score, txn_id in zip(iso_idx.tolist(), iso_scores[iso_idx].tolist(),
+                                          txn_ids[iso_idx].tolist())
+        )
+
+        # 2. Local Outlier Factor (needs more rows than neighbours)
+        if len(self.df) <= 5:
+            self.anomalies = anomalies
+            return anomalies
+
+        lof = LocalOutlierFactor(n_neighbors=min(5, len(self.df) - 1),
+                                 contamination=0.1, n_jobs=self.n_jobs)
+        lof_labels = lof.fit_predict(X)
+        lof_scores = lof.negative_outlier_factor_
+
+        # Avoid duplicates: rows already flagged by the Isolation Forest are skipped
+        seen = {a['index'] for a in anomalies}
+        lof_idx = np.flatnonzero(lof_labels == -1)
+        anomalies.extend(
+            {
+                'index': idx,
+                'method': 'Local Outlier Factor',
+                'anomaly_score': abs(score),
+                'transaction_id': txn_id,
+                'reason': 'Density-based outlier detected'
+            }
+            for idx, score, txn_id in zip(lof_idx.tolist(), lof_scores[lof_idx].tolist(),
+                                          txn_ids[lof_idx].tolist())
+            if idx not in seen
+        )
 
         self.anomalies = anomalies
         return anomalies
@@ -140,24 +194,30 @@ class AdvancedFraudDetectionEngine:
 
         G = nx.Graph()
 
-        # Add nodes and edges based on shared attributes
-        for idx, row in self.df.iterrows():
-            user_id = row.get('user_id', 'unknown')
-            merchant_id = row.get('merchant_id', 'unknown')
-            device_id = row.get('device_id', 'unknown')
-            ip_address = row.get('ip_address', 'unknown')
-
-            # Add nodes
-            G.add_node(f"user_{user_id}", type='user', risk=row.get('risk_score', 0))
-            G.add_node(f"merchant_{merchant_id}", type='merchant')
-            G.add_node(f"device_{device_id}", type='device')
-            G.add_node(f"ip_{ip_address}", type='ip')
-
-            # Add edges (connections)
-            G.add_edge(f"user_{user_id}", f"merchant_{merchant_id}")
-            G.add_edge(f"user_{user_id}", f"device_{device_id}")
-            G.add_edge(f"user_{user_id}", f"ip_{ip_address}")
-            G.add_edge(f"device_{device_id}", f"ip_{ip_address}")
+        # Node labels for every row, built column-wise; absent columns and missing
+        # values both map to an 'unknown' node, like row.get(..., 'unknown') did for columns
+        entities = (
+            self.df.reindex(columns=['user_id', 'merchant_id', 'device_id', 'ip_address'])
+            .astype(object)
+            .fillna('unknown')
+        )
+        users, merchants, devices, ips = (
+            np.char.add(prefix, entities[column].to_numpy().astype(str)).tolist()
+            for column, prefix in (('user_id', 'user_'), ('merchant_id', 'merchant_'),
+                                   ('device_id', 'device_'), ('ip_address', 'ip_'))
+        )
+        risks = self.df.reindex(columns=['risk_score'])['risk_score'].fillna(0).tolist()
+
+        # Add nodes in first-seen row order; a user keeps the risk of its last transaction
+        G.add_nodes_from(dict.fromkeys(chain.from_iterable(zip(users, merchants, devices, ips))))
+        for labels, node_type in ((users, 'user'), (merchants, 'merchant'), (devices, 'device'), (ips, 'ip')):
+            nx.set_node_attributes(G, dict.fromkeys(labels, node_type), 'type')
+        nx.set_node_attributes(G, dict(zip(users, risks)), 'risk')
+
+        # Add edges (connections), de-duplicated before insertion
+        G.add_edges_from(dict.fromkeys(chain.from_iterable(
+            zip(zip(users, merchants), zip(users, devices), zip(users, ips), zip(devices, ips))
+        )))
 
         # Detect communities and suspicious clusters
         suspicious_clusters = []
@@ -178,9 +238,13 @@ class AdvancedFraudDetectionEngine:
                         'risk_type': 'High-risk connection hub'
                     })
 
-            # Detect cliques (fully connected subgraphs)
-            cliques = list(nx.find_cliques(G))
-            large_cliques = [c for c in cliques if len(c) > 3]
+            # Detect cliques (fully connected subgraphs) around high-risk users only: the
+            # search runs on the subgraph induced by them and their direct neighbours. Every
+            # node of a clique with more than 3 members has degree >= 3 inside it, so only
+            # the 3-core of that subgraph can hold one.
+            seeds = set(high_risk_nodes)
+            candidates = seeds.union(*(G.adj[node] for node in seeds))
+            large_cliques = self._find_large_cliques(nx.k_core(G.subgraph(candidates), k=3))
 
             self.fraud_networks = {
                 'networks': suspicious_clusters,
@@ -195,6 +259,32 @@ class AdvancedFraudDetectionEngine:
 
         return self.fraud_networks
 
+    @staticmethod
+    def _find_large_cliques(G: nx.Graph) -> List[List[str]]:
+        """Maximal cliques with more than 3 members, capped at MAX_CLIQUES."""
+        if G.number_of_nodes() == 0:
+            return []
+
+        if nk is None:
+            # Enumeration is exponential on dense graphs, so stop at the cap
+            large_cliques = []
+            for clique in nx.find_cliques(G):
+                if len(clique) > 3:
+                    large_cliques.append(clique)
+                    if len(large_cliques) >= MAX_CLIQUES:
+                        break
+            return large_cliques
+
+        # networkit enumerates in C++ over consecutive node ids (nx2nk follows G.nodes() order);
+        # the callback keeps only large cliques instead of materializing all of them
+        nodes = list(G.nodes())
+        found = []
+        nk.clique.MaximalCliques(
+            nk.nxadapter.nx2nk(G),
+            callback=lambda clique: found.append(clique) if len(clique) > 3 else None
+        ).run()
+        return [[nodes[node_id] for node_id in clique] for clique in found[:MAX_CLIQUES]]
+
     def detect_money_laundering_patterns(self) -> List[Dict[str, Any]]:
         """Detect potential money laundering patterns."""
         if self.df is None or self.df.empty:
@@ -203,49 +293,70 @@ class AdvancedFraudDetectionEngine:
         patterns = []
 
         # 1. Structuring (multiple small transactions)
-        user_patterns = self.df.groupby('user_id').agg({
-            'amount': ['sum', 'count', 'mean', 'std']
-        }).reset_index()
-
-        for _, row in user_patterns.iterrows():
-            user_id = row[0]
-            total_amount = row[('amount', 'sum')]
-            transaction_count = row[('amount', 'count')]
-            avg_amount = row[('amount', 'mean')]
-            std_amount = row[('amount', 'std')]
-
-            # Structuring: many small transactions
-            if transaction_count > 5 and avg_amount < 1000 and total_amount > 5000:
-                patterns.append({
-                    'type': 'Potential Structuring',
-                    'user_id': user_id,
-                    'transaction_count': int(transaction_count),
-                    'total_amount': float(total_amount),
-                    'avg_amount': float(avg_amount),
-                    'risk_score': min(0.9, (transaction_count / 100) * avg_amount / 1000),
-                    'description': f'User {user_id} made {transaction_count} transactions totaling ${total_amount:.2f}'
-                })
+        user_patterns = self.df.groupby('user_id', observed=True).agg(
+            total_amount=('amount', 'sum'),
+            transaction_count=('amount', 'count'),
+            avg_amount=('amount', 'mean'),
+        )
+
+        # Structuring: many small transactions
+        structuring = user_patterns[(user_patterns['transaction_count'] > 5) &
+                                    (user_patterns['avg_amount'] < 1000) &
+                                    (user_patterns['total_amount'] > 5000)]
+        structuring_risk = np.minimum(
+            0.9, (structuring['transaction_count'] / 100) * structuring['avg_amount'] / 1000
+        )
+
+        patterns.extend(
+            {
+                'type': 'Potential Structuring',
+                'user_id': user_id,
+                'transaction_count': transaction_count,
+                'total_amount': total_amount,
+                'avg_amount': avg_amount,
+                'risk_score': risk_score,
+                'description': f'User {user_id} made {transaction_count} transactions totaling ${total_amount:.2f}'
+            }
+            for user_id, transaction_count, total_amount, avg_amount, risk_score in zip(
+                structuring.index.tolist(), structuring['transaction_count'].tolist(),
+                structuring['total_amount'].tolist(), structuring['avg_amount'].tolist(),
+                structuring_risk.tolist()
+            )
+        )
 
         # 2. Circular transactions (A->B->C->A)
-        user_merchant_pairs = self.df[['user_id', 'merchant_id']].drop_duplicates()
-
-        for user_id in self.df['user_id'].unique():
-            merchants = self.df[self.df['user_id'] == user_id]['merchant_id'].unique()
-            if len(merchants) > 2:
-                # Check for repeated patterns
-                user_txns = self.df[self.df['user_id'] == user_id]
-                merchant_counts = user_txns['merchant_id'].value_counts()
-
-                high_frequency_merchants = merchant_counts[merchant_counts > 3]
-                if len(high_frequency_merchants) > 0:
-                    patterns.append({
-                        'type': 'High-Frequency Merchant Cycling',
-                        'user_id': user_id,
-                        'unique_merchants': len(merchants),
-                        'high_frequency_merchants': int(len(high_frequency_merchants)),
-                        'risk_score': 0.7,
-                        'description': f'User cycling through multiple merchants frequently'
-                    })
+        # One (user, merchant) count table replaces a full-frame scan per user.
+        # Missing merchants still count as a distinct merchant, but never as a frequent one.
+        pair_counts = self.df.groupby(['user_id', 'merchant_id'], sort=False, dropna=False, observed=True).size()
+        user_ids = pair_counts.index.get_level_values('user_id')
+        merchant_ids = pair_counts.index.get_level_values('merchant_id')
+        known_user = np.asarray(user_ids.notna())
+        frequent = (pair_counts.to_numpy() > 3) & np.asarray(merchant_ids.notna())
+
+        merchant_stats = pd.DataFrame({
+            'user_id': user_ids[known_user],
+            'frequent': frequent[known_user],
+        }).groupby('user_id', sort=False, observed=True).agg(
+            unique_merchants=('frequent', 'size'),
+            high_frequency_merchants=('frequent', 'sum'),
+        )
+        cycling = merchant_stats[(merchant_stats['unique_merchants'] > 2) &
+                                 (merchant_stats['high_frequency_merchants'] > 0)]
+
+        patterns.extend(
+            {
+                'type': 'High-Frequency Merchant Cycling',
+                'user_id': user_id,
+                'unique_merchants': unique_merchants,
+                'high_frequency_merchants': high_frequency_merchants,
+                'risk_score': 0.7,
+                'description': f'User cycling through multiple merchants frequently'
+            }
+            for user_id, unique_merchants, high_frequency_merchants in zip(
+                cycling.index.tolist(), cycling['unique_merchants'].tolist(),
+                cycling['high_frequency_merchants'].tolist()
+            )
+        )
 
         self.money_laundering_patterns = patterns
         return patterns
@@ -255,193 +366,219 @@ class AdvancedFraudDetectionEngine:
         if self.df is None or self.df.empty:
             return {}
 
-        risk_profiles = {}
-
-        # Analyze users
-        for user_id in self.df['user_id'].unique():
-            user_txns = self.df[self.df['user_id'] == user_id]
-
-            # Base risk (from existing scores)
-            base_risk = user_txns['risk_score'].mean() if 'risk_score' in user_txns else 0.5
-
-            # ML-based risk (behavioral patterns)
-            ml_risk = self._calculate_ml_risk(user_txns)
-
-            # Behavioral risk
-            behavioral_risk = self._calculate_behavioral_risk(user_txns)
-
-            # Network risk
-            network_risk = self._calculate_network_risk(user_txns)
-
-            # Anomaly score
-            anomaly_score = self._calculate_entity_anomaly_score(user_txns)
-
-            # Weighted ensemble
-            final_score = (
-                0.25 * base_risk +
-                0.30 * ml_risk +
-                0.20 * behavioral_risk +
-                0.15 * network_risk +
-                0.10 * anomaly_score
-            )
-
-            risk_factors = self._identify_risk_factors(user_txns)
-            red_flags = self._identify_red_flags(user_txns)
-
-            risk_level = 'LOW' if final_score < 0.3 else (
-                'MEDIUM' if final_score < 0.7 else 'HIGH'
-            )
-
-            profile = RiskProfile(
-                entity_id=str(user_id),
-                entity_type='user',
-                base_risk_score=float(base_risk),
-                ml_risk_score=float(ml_risk),
-                behavioral_risk_score=float(behavioral_risk),
-                network_risk_score=float(network_risk),
-                anomaly_score=float(anomaly_score),
-                final_risk_score=float(final_score),
-                risk_level=risk_level,
-                risk_factors=risk_factors,
-                red_flags=red_flags,
-                confidence_score=float(min(1.0, len(user_txns) / 10))  # More data = more confidence
-            )
-
-            risk_profiles[str(user_id)] = profile
-
-        self.risk_profiles = risk_profiles
-        return risk_profiles
-
-    def _calculate_ml_risk(self, txns: pd.DataFrame) -> float:
-        """Calculate ML-based risk score."""
-        if txns.empty:
-            return 0.5
-
-        risk = 0.0
+        # One groupby serves every per-user stage; base and ML risk are column-wise
+        grouped = self.df.groupby('user_id', sort=False, observed=True)
+        user_features = self._aggregate_user_features(grouped)
+        ml_risks = self._calculate_ml_risk(user_features)
+        network_risks = self._calculate_network_risk(grouped)
+        anomaly_scores = self._calculate_entity_anomaly_score(user_features)
+
+        # Row positions per user index into column arrays extracted once
+        user_ids = user_features.index.tolist()
+        positions = grouped.indices
+        arrays = self._entity_arrays()
+        behavioral_risks = self._calculate_behavioral_risk(grouped)
+
+        base_risks = user_features['base_risk'].to_numpy()
+        final_scores = self._combine_risk_scores(
+            base_risks, ml_risks, behavioral_risks, network_risks, anomaly_scores
+        )
+        risk_levels = RISK_LEVELS[np.select([final_scores < 0.3, final_scores < 0.7], [0, 1], 2)]
+        # More data = more confidence
+        confidence_scores = np.minimum(1.0, user_features['transaction_count'].to_numpy() / 10)
+
+        # Column-per-field table of the profiles; the report serializes it in one call
+        entity_ids = [str(user_id) for user_id in user_ids]
+        profile_frame = pd.DataFrame({
+            'entity_id': entity_ids,
+            'entity_type': 'user',
+            'base_risk_score': base_risks,
+            'ml_risk_score': ml_risks,
+            'behavioral_risk_score': behavioral_risks,
+            'network_risk_score': network_risks,
+            'anomaly_score': anomaly_scores,
+            'final_risk_score': final_scores,
+            'risk_level': risk_levels,
+            'risk_factors': [
+                self._identify_risk_factors(positions[user_id], base_risk, arrays)
+                for user_id, base_risk in zip(user_ids, base_risks.tolist())
+            ],
+            'red_flags': [self._identify_red_flags(positions[user_id], arrays) for user_id in user_ids],
+            'confidence_score': confidence_scores,
+        }, index=entity_ids)
+        # Ids such as 1 and "1" share an entity id; the later profile wins, as with dict assignment
+        profile_frame = profile_frame[~profile_frame.index.duplicated(keep='last')]
+
+        self.profile_frame = profile_frame
+        self.risk_profiles = {
+            entity_id: RiskProfile(**fields)
+            for entity_id, fields in profile_frame.to_dict(orient='index').items()
+        }
+        return self.risk_profiles
+
+    @staticmethod
+    def _combine_risk_scores(base_risk: np.ndarray, ml_risk: np.ndarray, behavioral_risk: np.ndarray,
+                             network_risk: np.ndarray, anomaly_score: np.ndarray) -> np.ndarray:
+        """Weighted ensemble of the component scores for all users at once."""
+        return (
+            0.25 * base_risk +
+            0.30 * ml_risk +
+            0.20 * behavioral_risk +
+            0.15 * network_risk +
+            0.10 * anomaly_score
+        )
+
+    def _aggregate_user_features(self, grouped) -> pd.DataFrame:
+        """Per-user feature table built from a single groupby aggregation."""
+        # Row-level flags are computed once, then averaged per user
+        high_amount = self.df['amount'] > grouped['amount'].transform('quantile', 0.75)
+        unusual_hour = self.df['hour'].isin(UNUSUAL_HOURS)
+
+        return pd.DataFrame({
+            'user_id': self.df['user_id'],
+            'risk_score': self.df['risk_score'],
+            'high_amount': high_amount,
+            'unusual_hour': unusual_hour,
+        }).groupby('user_id', sort=False, observed=True).agg(
+            transaction_count=('risk_score', 'size'),
+            base_risk=('risk_score', 'mean'),
+            high_amount_pct=('high_amount', 'mean'),
+            unusual_hour_pct=('unusual_hour', 'mean'),
+        )
+
+    def _calculate_ml_risk(self, user_features: pd.DataFrame) -> np.ndarray:
+        """Calculate ML-based risk score for every user."""
+        transaction_count = user_features['transaction_count'].to_numpy()
 
         # High amount transactions
-        if 'amount' in txns.columns:
-            high_amount_pct = (txns['amount'] > txns['amount'].quantile(0.75)).sum() / len(txns)
-            risk += high_amount_pct * 0.3
+        risk = user_features['high_amount_pct'].to_numpy() * 0.3
 
         # Unusual times (late night, early morning)
-        if 'hour' in txns.columns:
-            unusual_hours = txns['hour'].isin([0, 1, 2, 3, 4, 5, 23]).sum() / len(txns)
-            risk += unusual_hours * 0.2
+        risk = risk + user_features['unusual_hour_pct'].to_numpy() * 0.2
 
         # High velocity
-        transaction_count = len(txns)
-        if transaction_count > 10:
-            risk += min(0.5, transaction_count / 100)
-
-        return min(1.0, risk)
-
-    def _calculate_behavioral_risk(self, txns: pd.DataFrame) -> float:
-        """Calculate behavioral risk score."""
-        if txns.empty:
-            return 0.5
-
-        risk = 0.0
-
-        # Merchant diversity
-        if 'merchant_id' in txns.columns:
-            merchant_count = txns['merchant_id'].nunique()
-            if merchant_count > 5:
-                risk += 0.3
-
-        # Device diversity
-        if 'device_id' in txns.columns:
-            device_count = txns['device_id'].nunique()
-            if device_count > 3:
-                risk += 0.2
-
-        # Geographic diversity
-        if 'user_country' in txns.columns:
-            country_count = txns['user_country'].nunique()
-            if country_count > 2:
-                risk += 0.3
-
-        # Amount variability
-        if 'amount' in txns.columns and len(txns) > 1:
-            std_amount = txns['amount'].std()
-            mean_amount = txns['amount'].mean()
-            cv = std_amount / mean_amount if mean_amount > 0 else 0
-            if cv > 1:
-                risk += 0.2
-
-        return min(1.0, risk)
-
-    def _calculate_network_risk(self, txns: pd.DataFrame) -> float:
-        """Calculate network-based risk score."""
-        if txns.empty:
-            return 0.5
-
-        risk = 0.0
-
-        # Shared attributes with other high-risk users
-        if 'device_id' in txns.columns:
-            device_id = txns['device_id'].iloc[0]
-            same_device_count = (self.df['device_id'] == device_id).sum()
-            if same_device_count > 3:
-                risk += 0.3
-
-        if 'ip_address' in txns.columns:
-            ip_addr = txns['ip_address'].iloc[0]
-            same_ip_count = (self.df['ip_address'] == ip_addr).sum()
-            if same_ip_count > 5:
-                risk += 0.2
-
-        return min(1.0, risk)
-
-    def _calculate_entity_anomaly_score(self, txns: pd.DataFrame) -> float:
-        """Calculate anomaly score for an entity."""
-        if txns.empty:
-            return 0.5
-
-        # Count anomalies for this entity
-        entity_id = txns['user_id'].iloc[0] if 'user_id' in txns.columns else None
-        matching_anomalies = [a for a in self.anomalies
-                            if a.get('transaction_id', '').startswith(str(entity_id))]
-
-        return min(1.0, len(matching_anomalies) / max(1, len(txns)))
-
-    def _identify_risk_factors(self, txns: pd.DataFrame) -> List[str]:
+        risk = risk + np.where(transaction_count > 10, np.minimum(0.5, transaction_count / 100), 0.0)
+
+        return np.minimum(1.0, risk)
+
+    def _entity_arrays(self) -> Dict[str, Any]:
+        """Column arrays shared by the per-user helpers (entity columns as factorized codes)."""
+        arrays = {
+            'amount': self.df['amount'].to_numpy(dtype=float),
+            'blocked': (self.df['decision'] == 'block').to_numpy(dtype=bool)
+                       if 'decision' in self.df.columns else None,
+        }
+        for column in ('merchant_id', 'device_id', 'user_country'):
+            # Missing values get code -1 and are ignored like nunique()/value_counts() do
+            arrays[column] = pd.factorize(self.df[column])[0] if column in self.df.columns else None
+        return arrays
+
+    @staticmethod
+    def _distinct_count(codes: np.ndarray, pos: np.ndarray) -> int:
+        """Number of distinct non-missing values among the rows at pos."""
+        values = codes[pos]
+        return len(np.unique(values[values >= 0]))
+
+    def _calculate_behavioral_risk(self, grouped) -> np.ndarray:
+        """Calculate behavioral risk score for every user."""
+        # Diversity counts and amount spread from one aggregation; nunique skips missing values
+        diversity_columns = [c for c in ('merchant_id', 'device_id', 'user_country') if c in self.df.columns]
+        stats = grouped.agg(
+            amount_mean=('amount', 'mean'),
+            amount_std=('amount', 'std'),
+            **{column: (column, 'nunique') for column in diversity_columns}
+        )
+        n_users = len(stats)
+
+        def distinct(column: str) -> np.ndarray:
+            if column not in stats.columns:
+                return np.zeros(n_users)
+            return stats[column].to_numpy()
+
+        # Amount variability: coefficient of variation (undefined std for < 2 amounts never exceeds 1)
+        mean_amount = stats['amount_mean'].to_numpy()
+        std_amount = stats['amount_std'].to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cv = np.where(mean_amount > 0, std_amount / mean_amount, 0.0)
+
+        risk = (
+            0.3 * (distinct('merchant_id') > 5) +  # Merchant diversity
+            0.2 * (distinct('device_id') > 3) +  # Device diversity
+            0.3 * (distinct('user_country') > 2) +  # Geographic diversity
+            0.2 * (cv > 1)
+        )
+        return np.minimum(1.0, risk)
+
+    def _calculate_network_risk(self, grouped) -> np.ndarray:
+        """Calculate network-based risk score for every user."""
+        # Each user's first transaction stands for their device/IP
+        first_txns = grouped.head(1)
+        risk = np.zeros(len(first_txns))
+
+        # Shared attributes with other high-risk users (usage counts computed once for the batch)
+        if 'device_id' in first_txns.columns:
+            same_device_count = first_txns['device_id'].map(self.df['device_id'].value_counts())
+            risk = risk + np.where(same_device_count.to_numpy(dtype=float, na_value=0) > 3, 0.3, 0.0)
+
+        if 'ip_address' in first_txns.columns:
+            same_ip_count = first_txns['ip_address'].map(self.df['ip_address'].value_counts())
+            risk = risk + np.where(same_ip_count.to_numpy(dtype=float, na_value=0) > 5, 0.2, 0.0)
+
+        return np.minimum(1.0, risk)
+
+    def _calculate_entity_anomaly_score(self, user_features: pd.DataFrame) -> np.ndarray:
+        """Calculate anomaly score for every user."""
+        transaction_count = user_features['transaction_count'].to_numpy()
+
+        # Count anomalies per user by joining anomaly row positions back to user_id
+        anomaly_idx = np.array([a['index'] for a in self.anomalies], dtype=np.intp)
+        anomaly_idx = anomaly_idx[anomaly_idx < len(self.df)]
+        anomaly_counts = (
+            self.df['user_id'].iloc[anomaly_idx].value_counts()
+            .reindex(user_features.index, fill_value=0)
+            .to_numpy()
+        )
+
+        return np.minimum(1.0, anomaly_counts / np.maximum(1, transaction_count))
+
+    def _identify_risk_factors(self, pos: np.ndarray, base_risk: float, arrays: Dict[str, Any]) -> List[str]:
         """Identify risk factors for an entity."""
         factors = []
 
-        if 'risk_score' in txns.columns:
-            if txns['risk_score'].mean() > 0.7:
-                factors.append('High average risk score')
+        if base_risk > 0.7:
+            factors.append('High average risk score')
 
-        if 'amount' in txns.columns:
-            if txns['amount'].max() > txns['amount'].quantile(0.95):
-                factors.append('Unusually high transaction amounts')
+        amounts = arrays['amount'][pos]
+        amounts = amounts[~np.isnan(amounts)]
+        if len(amounts) and amounts.max() > np.percentile(amounts, 95):
+            factors.append('Unusually high transaction amounts')
 
-        if 'device_id' in txns.columns:
-            if txns['device_id'].nunique() > 3:
+        if arrays['device_id'] is not None:
+            if self._distinct_count(arrays['device_id'], pos) > 3:
                 factors.append('Multiple devices used')
 
-        if 'user_country' in txns.columns:
-            if txns['user_country'].nunique() > 1:
+        if arrays['user_country'] is not None:
+            if self._distinct_count(arrays['user_country'], pos) > 1:
                 factors.append('Multiple countries')
 
         return factors
 
-    def _identify_red_flags(self, txns: pd.DataFrame) -> List[str]:
+    def _identify_red_flags(self, pos: np.ndarray, arrays: Dict[str, Any]) -> List[str]:
         """Identify critical red flags."""
         flags = []
 
-        if len(txns) > 10 and 'amount' in txns.columns:
-            if txns['amount'].sum() > 50000:
+        if len(pos) > 10:
+            if np.nansum(arrays['amount'][pos]) > 50000:
                 flags.append('Large cumulative transaction amount')
 
-        if 'decision' in txns.columns:
-            blocked_count = (txns['decision'] == 'block').sum()
-            if blocked_count > len(txns) * 0.5:
+        if arrays['blocked'] is not None:
+            blocked_count = arrays['blocked'][pos].sum()
+            if blocked_count > len(pos) * 0.5:
                 flags.append('High proportion of blocked transactions')
 
-        if 'merchant_id' in txns.columns:
-            merchant_counts = txns['merchant_id'].value_counts()
+        if arrays['merchant_id'] is not None:
+            merchant_codes = arrays['merchant_id'][pos]
+            _, merchant_counts = np.unique(merchant_codes[merchant_codes >= 0], return_counts=True)
             if (merchant_counts > 3).sum() > 2:
                 flags.append('Repeated transactions with suspicious merchants')
 
@@ -449,38 +586,26 @@ class AdvancedFraudDetectionEngine:
 
     def generate_comprehensive_report(self) -> Dict[str, Any]:
         """Generate comprehensive analysis report."""
+        # Profiles, level counts and the mean score all come from the profile table
+        if self.profile_frame is None or self.profile_frame.empty:
+            risk_profiles, level_counts, avg_risk_score = {}, {}, 0.0
+        else:
+            risk_profiles = self.profile_frame.to_dict(orient='index')
+            level_counts = self.profile_frame['risk_level'].value_counts()
+            avg_risk_score = float(self.profile_frame['final_risk_score'].mean())
+
         return {
             'timestamp': datetime.utcnow().isoformat(),
             'total_transactions': len(self.transactions),
             'anomalies_detected': len(self.anomalies),
             'fraud_networks': self.fraud_networks,
             'money_laundering_patterns': self.money_laundering_patterns,
-            'risk_profiles': {
-                entity_id: {
-                    'entity_id': profile.entity_id,
-                    'entity_type': profile.entity_type,
-                    'base_risk_score': profile.base_risk_score,
-                    'ml_risk_score': profile.ml_risk_score,
-                    'behavioral_risk_score': profile.behavioral_risk_score,
-                    'network_risk_score': profile.network_risk_score,
-                    'anomaly_score': profile.anomaly_score,
-                    'final_risk_score': profile.final_risk_score,
-                    'risk_level': profile.risk_level,
-                    'risk_factors': profile.risk_factors,
-                    'red_flags': profile.red_flags,
-                    'confidence_score': profile.confidence_score
-                }
-                for entity_id, profile in self.risk_profiles.items()
-            },
+            'risk_profiles': risk_profiles,
             'summary': {
-                'high_risk_entities': len([p for p in self.risk_profiles.values()
-                                          if p.risk_level == 'HIGH']),
-                'medium_risk_entities': len([p for p in self.risk_profiles.values()
-                                            if p.risk_level == 'MEDIUM']),
-                'low_risk_entities': len([p for p in self.risk_profiles.values()
-                                         if p.risk_level == 'LOW']),
-                'avg_risk_score': float(np.mean([p.final_risk_score
-                                                 for p in self.risk_profiles.values()])),
+                'high_risk_entities': int(level_counts.get('HIGH', 0)),
+                'medium_risk_entities': int(level_counts.get('MEDIUM', 0)),
+                'low_risk_entities': int(level_counts.get('LOW', 0)),
+                'avg_risk_score': avg_risk_score,
                 'suspicious_networks': len(self.fraud_networks.get('networks', [])),
                 'ml_anomalies': len(self.anomalies),
                 'potential_moneylaundering_cases': len(self.money_laundering_patterns)
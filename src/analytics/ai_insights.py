@@ -9,14 +9,28 @@ Analyzes transaction data with machine learning to provide:
 - Market intelligence
 """
 
-from typing import List, Dict, Any
-from dataclasses import dataclass
-from collections import Counter
-import statistics
+from typing import List, Dict, Any, Tuple
+from dataclasses import dataclass, asdict
+from collections import Counter, defaultdict
+from itertools import count
+from array import array
+import numpy as np
 from datetime import datetime, timedelta
 
+try:
+    import polars as pl
+except ImportError:
+    pl = None
 
-@dataclass
+# Decision histogram slots; anything else (including a missing decision) counts as OTHER
+DECISION_CODES = {"allow": 0, "block": 1, "review": 2}
+ALLOW, BLOCK, REVIEW, OTHER = range(4)
+
+# Entity columns coded per analysis (absent values count as "unknown")
+ENTITY_COLUMNS = ("merchant_id", "user_id", "user_country", "device_id")
+
+
+@dataclass(slots=True, frozen=True)
 class TransactionInsight:
     """Business insight from transaction data."""
     title: str
@@ -32,17 +46,47 @@ class AIInsightsEngine:
 
     def __init__(self):
         self.transactions = []
+        self.frame = None
+        self._columns = None
         self.insights = []
+        self._severity_counts = None
+        self.total_transactions = 0
+        self.amounts = np.empty(0)
+        self.risk_scores = np.empty(0)
+        self.decision_counts = np.zeros(4, dtype=np.int64)
+        self.merchant_data = {}
+        self.user_data = {}
+        self.country_stats = {}
+        self.high_risk_count = 0
+        self.high_risk_amount_sum = 0.0
+        self.blocked_count = 0
+        self.blocked_amount_sum = 0.0
 
     def load_transactions(self, transactions: List[Dict[str, Any]]) -> None:
-        """Load transaction data for analysis."""
+        """Load transaction data for analysis (encoded to typed column arrays once, here)."""
         self.transactions = transactions
+        self.frame = None
+        self._columns = self._transaction_columns()
+
+    def load_frame(self, frame: "pl.LazyFrame") -> None:
+        """Load a polars LazyFrame/DataFrame (e.g. from FileProcessor.process_csv_lazy) for analysis."""
+        if pl is None:
+            raise ValueError("polars not installed. Install with: pip install polars")
+        self.transactions = []
+        self.frame = frame
+        self._columns = None
 
     def analyze(self) -> List[TransactionInsight]:
         """Run all analyses and generate insights."""
         self.insights = []
+        self._severity_counts = None
+
+        if self.frame is None and not self.transactions:
+            return self.insights
 
-        if not self.transactions:
+        # Aggregates are built once; every analysis reads them
+        self._build_aggregates()
+        if not self.total_transactions:
             return self.insights
 
         # Run different analysis types
@@ -57,79 +101,212 @@ class AIInsightsEngine:
 
         return self.insights
 
+    def _build_aggregates(self) -> None:
+        """Collect column arrays and per-merchant/user/country accumulators once per analysis."""
+        if self.frame is not None:
+            amounts, risk_scores, decisions, entities = self._frame_columns()
+        else:
+            if self._columns is None:
+                self._columns = self._transaction_columns()
+            amounts, risk_scores, decisions, entities = self._columns
+
+        # Batch totals are boolean-mask reductions and per-entity totals are bincounts
+        # over the integer codes
+        high_risk_mask = risk_scores > 0.7
+        blocked_mask = decisions == BLOCK
+        merchant_codes, merchant_ids = entities["merchant_id"]
+        user_codes, user_ids = entities["user_id"]
+        country_codes, country_ids = entities["user_country"]
+        device_codes, device_ids = entities["device_id"]
+
+        merchant_data = self._entity_totals(merchant_codes, merchant_ids,
+                                            total_amount=amounts,
+                                            high_risk_count=high_risk_mask,
+                                            blocked_count=blocked_mask)
+        user_data = self._entity_totals(user_codes, user_ids,
+                                        total_amount=amounts,
+                                        blocked_count=blocked_mask)
+        user_data.update(
+            unique_merchants=self._distinct_per_entity(user_codes, len(user_ids),
+                                                       merchant_codes, len(merchant_ids)),
+            unique_devices=self._distinct_per_entity(user_codes, len(user_ids),
+                                                     device_codes, len(device_ids)),
+            unique_countries=self._distinct_per_entity(user_codes, len(user_ids),
+                                                       country_codes, len(country_ids)),
+        )
+        country_stats = self._entity_totals(country_codes, country_ids,
+                                            high_risk_count=high_risk_mask)
+
+        self.total_transactions = len(amounts)
+        self.amounts = amounts
+        self.risk_scores = risk_scores
+        self.decision_counts = np.bincount(decisions, minlength=4)
+        self.merchant_data = merchant_data
+        self.user_data = user_data
+        self.country_stats = country_stats
+        # Masked reductions: counted and summed in place, no filtered copies
+        self.high_risk_count = int(np.count_nonzero(high_risk_mask))
+        self.high_risk_amount_sum = float(np.sum(amounts, where=high_risk_mask))
+        self.blocked_count = int(np.count_nonzero(blocked_mask))
+        self.blocked_amount_sum = float(np.sum(amounts, where=blocked_mask))
+
+    def _transaction_columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """Amount, risk score and decision-code arrays plus entity codes, extracted column by column."""
+        transactions = self.transactions
+
+        # One comprehension per field runs the loop in the interpreter's fast path; keys may be
+        # absent (and the caller's dicts are not touched), so each read is a .get with a default
+        amounts = array('d', [t.get("amount", 0) for t in transactions])
+        risk_scores = array('d', [t.get("risk_score", 0) for t in transactions])
+        decision_code = DECISION_CODES.get
+        decisions = array('b', [decision_code(t.get("decision"), OTHER) for t in transactions])
+
+        def entity(name):
+            # Dense integer codes in first-seen order: a missing key draws the next code
+            index = defaultdict(count().__next__)
+            codes = array('q', map(index.__getitem__, [t.get(name, "unknown") for t in transactions]))
+            return np.frombuffer(codes, dtype=np.int64), list(index)
+
+        # Zero-copy views of the buffers
+        return (
+            np.frombuffer(amounts, dtype=np.float64),
+            np.frombuffer(risk_scores, dtype=np.float64),
+            np.frombuffer(decisions, dtype=np.int8),
+            {name: entity(name) for name in ENTITY_COLUMNS},
+        )
+
+    def _frame_columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        """Same columns as _transaction_columns, selected straight from the polars frame."""
+        names = set(self.frame.collect_schema().names())
+
+        def column(name, default, dtype):
+            expr = pl.col(name) if name in names else pl.lit(None)
+            return expr.cast(dtype).fill_null(default).alias(name)
+
+        # Only these columns are read; a lazy scan pushes the projection down to the file
+        selected = self.frame.select(
+            column("amount", 0.0, pl.Float64),
+            column("risk_score", 0.0, pl.Float64),
+            column("decision", "", pl.String),
+            *(column(name, "unknown", pl.String) for name in ENTITY_COLUMNS),
+        )
+        if isinstance(selected, pl.LazyFrame):
+            selected = selected.collect()
+
+        decision_values = selected["decision"].to_numpy()
+        decisions = np.full(len(selected), OTHER, dtype=np.int8)
+        for decision, code in DECISION_CODES.items():
+            decisions[decision_values == decision] = code
+
+        return (
+            selected["amount"].to_numpy(),
+            selected["risk_score"].to_numpy(),
+            decisions,
+            {name: self._factorize(selected[name].to_numpy()) for name in ENTITY_COLUMNS},
+        )
+
+    @staticmethod
+    def _factorize(values: np.ndarray) -> Tuple[np.ndarray, List[Any]]:
+        """Dense integer codes and unique values, both in first-seen order."""
+        uniques, first_seen, inverse = np.unique(values, return_index=True, return_inverse=True)
+        order = np.argsort(first_seen)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return rank[inverse.reshape(-1)], uniques[order].tolist()
+
+    @staticmethod
+    def _entity_totals(codes: np.ndarray, ids: List[Any], **columns: np.ndarray) -> Dict[str, Any]:
+        """Per-entity table: ids in code order, row counts and one weighted sum per column."""
+        size = len(ids)
+        table = {"ids": ids, "count": np.bincount(codes, minlength=size)}
+        for name, weights in columns.items():
+            totals = np.bincount(codes, weights=weights, minlength=size)
+            # Boolean flags sum to counts
+            table[name] = totals.astype(np.int64) if weights.dtype == bool else totals
+        return table
+
+    @staticmethod
+    def _distinct_per_entity(codes: np.ndarray, size: int, value_codes: np.ndarray, n_values: int) -> np.ndarray:
+        """Number of distinct values seen per entity, from the sorted-unique (entity, value) pairs."""
+        pairs = codes * n_values + value_codes
+        return np.bincount(np.unique(pairs) // n_values, minlength=size)
+
     def _analyze_fraud_patterns(self) -> None:
         """Detect and analyze fraud patterns."""
-        high_risk = [t for t in self.transactions if t.get("risk_score", 0) > 0.7]
-        blocked = [t for t in self.transactions if t.get("decision") == "block"]
+        high_risk_count = self.high_risk_count
+        blocked_count = self.blocked_count
 
-        if high_risk:
-            fraud_rate = len(high_risk) / len(self.transactions) * 100
+        if high_risk_count:
+            fraud_rate = high_risk_count / self.total_transactions * 100
 
             if fraud_rate > 10:
                 self.insights.append(TransactionInsight(
                     title="High Fraud Alert",
-                    description=f"Detected {len(high_risk)} high-risk transactions ({fraud_rate:.1f}% of total)",
+                    description=f"Detected {high_risk_count} high-risk transactions ({fraud_rate:.1f}% of total)",
                     severity="critical",
                     impact="Significant fraud risk detected. Immediate review recommended.",
                     recommendation="Enable enhanced verification for high-risk transactions. Review merchant whitelisting.",
                     metrics={
-                        "high_risk_count": len(high_risk),
+                        "high_risk_count": high_risk_count,
                         "fraud_rate_percent": fraud_rate,
-                        "avg_fraud_amount": sum(t.get("amount", 0) for t in high_risk) / len(high_risk) if high_risk else 0
+                        "avg_fraud_amount": self.high_risk_amount_sum / high_risk_count
                     }
                 ))
             elif fraud_rate > 5:
                 self.insights.append(TransactionInsight(
                     title="Moderate Fraud Risk",
-                    description=f"Detected {len(high_risk)} high-risk transactions ({fraud_rate:.1f}%)",
+                    description=f"Detected {high_risk_count} high-risk transactions ({fraud_rate:.1f}%)",
                     severity="warning",
                     impact="Elevated fraud risk requires monitoring.",
                     recommendation="Increase monitoring frequency. Review blocked transactions for patterns.",
                     metrics={
-                        "high_risk_count": len(high_risk),
+                        "high_risk_count": high_risk_count,
                         "fraud_rate_percent": fraud_rate
                     }
                 ))
 
-        if blocked:
+        if blocked_count:
             self.insights.append(TransactionInsight(
                 title="Blocked Transactions Summary",
-                description=f"Blocked {len(blocked)} transactions",
+                description=f"Blocked {blocked_count} transactions",
                 severity="info",
                 impact="These transactions were rejected by risk engine.",
                 recommendation="Review blocked transactions quarterly. Adjust thresholds if too many legitimate transactions blocked.",
                 metrics={
-                    "blocked_count": len(blocked),
-                    "total_blocked_amount": sum(t.get("amount", 0) for t in blocked),
-                    "avg_blocked_amount": sum(t.get("amount", 0) for t in blocked) / len(blocked) if blocked else 0
+                    "blocked_count": blocked_count,
+                    "total_blocked_amount": self.blocked_amount_sum,
+                    "avg_blocked_amount": self.blocked_amount_sum / blocked_count
                 }
             ))
 
     def _analyze_spending_behavior(self) -> None:
         """Analyze spending patterns and outliers."""
-        if not self.transactions:
-            return
-
-        amounts = [t.get("amount", 0) for t in self.transactions]
-
-        if amounts:
-            avg_amount = statistics.mean(amounts)
-            median_amount = statistics.median(amounts)
-            max_amount = max(amounts)
+        amounts = self.amounts
+
+        if amounts.size:
+            avg_amount = float(amounts.mean())
+            # Median by selection (introselect) instead of a full sort
+            mid = amounts.size // 2
+            if amounts.size % 2:
+                median_amount = float(np.partition(amounts, mid)[mid])
+            else:
+                lower, upper = np.partition(amounts, (mid - 1, mid))[mid - 1:mid + 1]
+                median_amount = float((lower + upper) / 2)
+            max_amount = float(amounts.max())
 
             # Find unusual spending
             threshold = avg_amount * 2.5
-            unusual = [t for t in self.transactions if t.get("amount", 0) > threshold]
+            unusual_count = int(np.count_nonzero(amounts > threshold))
 
-            if unusual:
+            if unusual_count:
                 self.insights.append(TransactionInsight(
                     title="Unusual Spending Detected",
-                    description=f"{len(unusual)} transactions exceed normal spending patterns",
+                    description=f"{unusual_count} transactions exceed normal spending patterns",
                     severity="warning",
                     impact="Potential fraud or legitimate high-value purchases.",
                     recommendation="Review high-value transactions. Consider requiring additional verification.",
                     metrics={
-                        "unusual_count": len(unusual),
+                        "unusual_count": unusual_count,
                         "threshold_amount": threshold,
                         "avg_transaction": avg_amount,
                         "median_transaction": median_amount,
@@ -139,11 +316,12 @@ class AIInsightsEngine:
 
     def _analyze_risk_distribution(self) -> None:
         """Analyze distribution of risk scores."""
-        decisions = Counter(t.get("decision") for t in self.transactions if t.get("decision"))
+        allowed, blocked, reviewed, _ = self.decision_counts.tolist()
 
-        allow_pct = (decisions.get("allow", 0) / len(self.transactions) * 100) if self.transactions else 0
-        block_pct = (decisions.get("block", 0) / len(self.transactions) * 100) if self.transactions else 0
-        review_pct = (decisions.get("review", 0) / len(self.transactions) * 100) if self.transactions else 0
+        total = self.total_transactions
+        allow_pct = (allowed / total * 100) if total else 0
+        block_pct = (blocked / total * 100) if total else 0
+        review_pct = (reviewed / total * 100) if total else 0
 
         self.insights.append(TransactionInsight(
             title="Decision Distribution",
@@ -155,215 +333,152 @@ class AIInsightsEngine:
                 "approval_rate": allow_pct,
                 "block_rate": block_pct,
                 "review_rate": review_pct,
-                "total_transactions": len(self.transactions)
+                "total_transactions": total
             }
         ))
 
     def _analyze_merchant_patterns(self) -> None:
         """Analyze transaction patterns by merchant."""
-        merchant_data = {}
-
-        for t in self.transactions:
-            merchant_id = t.get("merchant_id", "unknown")
-            if merchant_id not in merchant_data:
-                merchant_data[merchant_id] = {
-                    "count": 0,
-                    "total_amount": 0,
-                    "high_risk_count": 0,
-                    "blocked_count": 0
-                }
-
-            merchant_data[merchant_id]["count"] += 1
-            merchant_data[merchant_id]["total_amount"] += t.get("amount", 0)
-
-            if t.get("risk_score", 0) > 0.7:
-                merchant_data[merchant_id]["high_risk_count"] += 1
-            if t.get("decision") == "block":
-                merchant_data[merchant_id]["blocked_count"] += 1
+        merchants = self.merchant_data
+        high_risk_rates = merchants["high_risk_count"] / merchants["count"]
 
         # Find problematic merchants
-        problematic = {
-            m: d for m, d in merchant_data.items()
-            if d["high_risk_count"] / d["count"] > 0.3  # >30% high risk
-        }
+        problematic = high_risk_rates > 0.3  # >30% high risk
 
-        if problematic:
-            worst_merchant = max(problematic.items(),
-                                key=lambda x: x[1]["high_risk_count"] / x[1]["count"])
+        if problematic.any():
+            # argmax keeps the first of equal rates, like max() did
+            worst = int(np.argmax(np.where(problematic, high_risk_rates, -1.0)))
+            high_risk_count = int(merchants["high_risk_count"][worst])
+            count = int(merchants["count"][worst])
 
             self.insights.append(TransactionInsight(
                 title="High-Risk Merchant Detected",
-                description=f"Merchant {worst_merchant[0]} has {worst_merchant[1]['high_risk_count']} high-risk transactions",
+                description=f"Merchant {merchants['ids'][worst]} has {high_risk_count} high-risk transactions",
                 severity="warning",
                 impact="Merchant may be associated with fraudulent activity.",
                 recommendation="Flag merchant for review. Consider temporary suspension or enhanced verification.",
                 metrics={
-                    "merchant_id": worst_merchant[0],
-                    "high_risk_transactions": worst_merchant[1]["high_risk_count"],
-                    "total_transactions": worst_merchant[1]["count"],
-                    "high_risk_rate": worst_merchant[1]["high_risk_count"] / worst_merchant[1]["count"] * 100
+                    "merchant_id": merchants["ids"][worst],
+                    "high_risk_transactions": high_risk_count,
+                    "total_transactions": count,
+                    "high_risk_rate": high_risk_count / count * 100
                 }
             ))
 
     def _analyze_user_patterns(self) -> None:
         """Analyze transaction patterns by user."""
-        user_data = {}
-
-        for t in self.transactions:
-            user_id = t.get("user_id", "unknown")
-            if user_id not in user_data:
-                user_data[user_id] = {
-                    "count": 0,
-                    "total_amount": 0,
-                    "merchants": set(),
-                    "devices": set(),
-                    "countries": set(),
-                    "blocked_count": 0
-                }
-
-            user_data[user_id]["count"] += 1
-            user_data[user_id]["total_amount"] += t.get("amount", 0)
-            user_data[user_id]["merchants"].add(t.get("merchant_id", "unknown"))
-            user_data[user_id]["devices"].add(t.get("device_id", "unknown"))
-            user_data[user_id]["countries"].add(t.get("user_country", "unknown"))
-
-            if t.get("decision") == "block":
-                user_data[user_id]["blocked_count"] += 1
+        users = self.user_data
+        unique_countries = users["unique_countries"]
+        unique_devices = users["unique_devices"]
 
         # Find suspicious users (many countries/devices)
-        suspicious = {
-            u: d for u, d in user_data.items()
-            if len(d["countries"]) > 3 or len(d["devices"]) > 5
-        }
+        suspicious = (unique_countries > 3) | (unique_devices > 5)
 
-        if suspicious:
-            most_suspicious = max(suspicious.items(),
-                                 key=lambda x: len(x[1]["countries"]) + len(x[1]["devices"]))
+        if suspicious.any():
+            most_suspicious = int(np.argmax(np.where(suspicious, unique_countries + unique_devices, -1)))
 
             self.insights.append(TransactionInsight(
                 title="Account Takeover Risk",
-                description=f"User {most_suspicious[0]} showing suspicious patterns across multiple devices/locations",
+                description=f"User {users['ids'][most_suspicious]} showing suspicious patterns across multiple devices/locations",
                 severity="warning",
                 impact="Potential account compromise or fraud.",
                 recommendation="Contact user for verification. Review recent activity. Consider requiring password reset.",
                 metrics={
-                    "user_id": most_suspicious[0],
-                    "unique_countries": len(most_suspicious[1]["countries"]),
-                    "unique_devices": len(most_suspicious[1]["devices"]),
-                    "unique_merchants": len(most_suspicious[1]["merchants"]),
-                    "total_transactions": most_suspicious[1]["count"]
+                    "user_id": users["ids"][most_suspicious],
+                    "unique_countries": int(unique_countries[most_suspicious]),
+                    "unique_devices": int(unique_devices[most_suspicious]),
+                    "unique_merchants": int(users["unique_merchants"][most_suspicious]),
+                    "total_transactions": int(users["count"][most_suspicious])
                 }
             ))
 
     def _analyze_geographic_patterns(self) -> None:
         """Analyze geographic transaction patterns."""
-        country_counts = Counter(t.get("user_country", "unknown")
-                                for t in self.transactions)
-        country_risks = {}
-
-        for country in country_counts:
-            country_txns = [t for t in self.transactions
-                           if t.get("user_country") == country]
-            high_risk = len([t for t in country_txns
-                           if t.get("risk_score", 0) > 0.7])
-
-            country_risks[country] = {
-                "count": len(country_txns),
-                "high_risk_count": high_risk,
-                "high_risk_rate": high_risk / len(country_txns) if country_txns else 0
-            }
+        countries = self.country_stats
+        high_risk_rates = countries["high_risk_count"] / countries["count"]
 
         # Find high-risk regions
-        high_risk_countries = {
-            c: d for c, d in country_risks.items()
-            if d["high_risk_rate"] > 0.4  # >40% high risk
-        }
+        high_risk_countries = high_risk_rates > 0.4  # >40% high risk
 
-        if high_risk_countries:
-            worst_country = max(high_risk_countries.items(),
-                               key=lambda x: x[1]["high_risk_rate"])
+        if high_risk_countries.any():
+            worst = int(np.argmax(np.where(high_risk_countries, high_risk_rates, -1.0)))
 
             self.insights.append(TransactionInsight(
                 title="Geographic Risk Pattern",
-                description=f"High fraud rate detected from {worst_country[0]}",
+                description=f"High fraud rate detected from {countries['ids'][worst]}",
                 severity="warning",
                 impact="Transactions from specific regions show elevated risk.",
                 recommendation="Review country risk settings. Consider additional verification for high-risk regions.",
                 metrics={
-                    "country": worst_country[0],
-                    "high_risk_transactions": worst_country[1]["high_risk_count"],
-                    "total_from_country": worst_country[1]["count"],
-                    "high_risk_rate_percent": worst_country[1]["high_risk_rate"] * 100
+                    "country": countries["ids"][worst],
+                    "high_risk_transactions": int(countries["high_risk_count"][worst]),
+                    "total_from_country": int(countries["count"][worst]),
+                    "high_risk_rate_percent": float(high_risk_rates[worst]) * 100
                 }
             ))
 
     def _analyze_velocity_patterns(self) -> None:
         """Analyze transaction velocity (frequency over time)."""
-        # Simple velocity check - transactions per hour per user
-        user_velocities = {}
-
-        for t in self.transactions:
-            user_id = t.get("user_id", "unknown")
-            if user_id not in user_velocities:
-                user_velocities[user_id] = 0
-            user_velocities[user_id] += 1
+        # Simple velocity check - transactions per hour per user, from the per-user counts
+        users = self.user_data
+        user_velocities = users["count"]
 
         # Find high-velocity users
-        high_velocity = {u: v for u, v in user_velocities.items() if v > 10}
-
-        if high_velocity:
-            worst_user = max(high_velocity.items(), key=lambda x: x[1])
+        if (user_velocities > 10).any():
+            worst = int(np.argmax(user_velocities))
+            user_id = users["ids"][worst]
+            transaction_count = int(user_velocities[worst])
 
             self.insights.append(TransactionInsight(
                 title="High Transaction Velocity",
-                description=f"User {worst_user[0]} made {worst_user[1]} transactions in short timeframe",
+                description=f"User {user_id} made {transaction_count} transactions in short timeframe",
                 severity="warning",
                 impact="Unusually high frequency may indicate automation or fraud.",
                 recommendation="Review user for bot activity. Check for card testing or account compromise.",
                 metrics={
-                    "user_id": worst_user[0],
-                    "transaction_count": worst_user[1],
-                    "avg_user_transactions": sum(user_velocities.values()) / len(user_velocities)
+                    "user_id": user_id,
+                    "transaction_count": transaction_count,
+                    "avg_user_transactions": self.total_transactions / len(user_velocities)
                 }
             ))
 
     def _analyze_recommendations(self) -> None:
         """Generate strategic recommendations based on all data."""
-        if not self.transactions:
+        total = self.total_transactions
+        if not total:
             return
 
-        total = len(self.transactions)
+        # All three counts come from the decision histogram; each rate is computed once
+        approved, blocked, reviewed, _ = self.decision_counts.tolist()
+        approval_rate = approved / total * 100
+        review_rate = reviewed / total * 100
 
         # Check approval rate
-        approved = len([t for t in self.transactions if t.get("decision") == "allow"])
-        approval_rate = approved / total * 100
 
         recommendations = []
 
+        # (action, reason, impact)
         if approval_rate < 85:
-            recommendations.append({
-                "action": "Relax Thresholds",
-                "reason": f"Low approval rate ({approval_rate:.1f}%)",
-                "impact": "Improve customer experience"
-            })
+            recommendations.append((
+                "Relax Thresholds",
+                f"Low approval rate ({approval_rate:.1f}%)",
+                "Improve customer experience"
+            ))
 
         if approval_rate > 95:
-            recommendations.append({
-                "action": "Tighten Thresholds",
-                "reason": f"High approval rate ({approval_rate:.1f}%) may miss fraud",
-                "impact": "Improve fraud detection"
-            })
+            recommendations.append((
+                "Tighten Thresholds",
+                f"High approval rate ({approval_rate:.1f}%) may miss fraud",
+                "Improve fraud detection"
+            ))
 
         # Check blocked vs reviewed
-        blocked = len([t for t in self.transactions if t.get("decision") == "block"])
-        reviewed = len([t for t in self.transactions if t.get("decision") == "review"])
-
         if reviewed / total > 0.2:
-            recommendations.append({
-                "action": "Reduce Review Queue",
-                "reason": f"High review rate ({reviewed / total * 100:.1f}%)",
-                "impact": "Reduce manual review workload"
-            })
+            recommendations.append((
+                "Reduce Review Queue",
+                f"High review rate ({review_rate:.1f}%)",
+                "Reduce manual review workload"
+            ))
 
         if recommendations:
             self.insights.append(TransactionInsight(
@@ -371,31 +486,26 @@ class AIInsightsEngine:
                 description=f"Based on {total} transactions analyzed",
                 severity="info",
                 impact="Optimize risk engine performance and user experience",
-                recommendation="; ".join([f"{r['action']}: {r['reason']}" for r in recommendations]),
+                recommendation="; ".join(f"{action}: {reason}" for action, reason, _ in recommendations),
                 metrics={
                     "recommendations_count": len(recommendations),
                     "approval_rate": approval_rate,
                     "blocked_rate": blocked / total * 100,
-                    "review_rate": reviewed / total * 100
+                    "review_rate": review_rate
                 }
             ))
 
     def get_summary(self) -> Dict[str, Any]:
         """Get summary of all insights."""
+        # Severity counts are tallied once per analyze() run; the insight dicts are
+        # built per call, so callers never share mutable state with the engine
+        if self._severity_counts is None:
+            self._severity_counts = Counter(i.severity for i in self.insights)
+
         return {
             "total_insights": len(self.insights),
-            "critical": len([i for i in self.insights if i.severity == "critical"]),
-            "warning": len([i for i in self.insights if i.severity == "warning"]),
-            "info": len([i for i in self.insights if i.severity == "info"]),
-            "insights": [
-                {
-                    "title": i.title,
-                    "description": i.description,
-                    "severity": i.severity,
-                    "impact": i.impact,
-                    "recommendation": i.recommendation,
-                    "metrics": i.metrics
-                }
-                for i in self.insights
-            ]
+            "critical": self._severity_counts["critical"],
+            "warning": self._severity_counts["warning"],
+            "info": self._severity_counts["info"],
+            "insights": [asdict(i) for i in self.insights]
         }
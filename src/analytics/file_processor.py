@@ -10,9 +10,51 @@ Handles multiple file formats:
 """
 
 import csv
+import hashlib
 import json
-from typing import List, Dict, Any
+import mmap
+import os
+import tempfile
+import zipfile
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, time
+from typing import List, Dict, Any, Optional
 from pathlib import Path
+from xml.etree import ElementTree
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+    from pyarrow import parquet as pq
+except ImportError:
+    pa = None
+    pacsv = None
+    pq = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# Columns parsed as floats (header match is case-insensitive)
+NUMERIC_COLUMNS = ('amount', 'risk_score')
+
+# Namespace of xl/workbook.xml, read to find the active Excel sheet
+SPREADSHEETML_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+# Arrow snapshots kept per upload cache directory; the least recently used are evicted
+UPLOAD_CACHE_MAX_ENTRIES = 64
 
 
 class FileProcessor:
@@ -21,38 +63,96 @@ class FileProcessor:
     @staticmethod
     def process_csv(file_path: str) -> List[Dict[str, Any]]:
         """Process CSV file into transaction list."""
+        if pa is not None:
+            try:
+                # Blank or non-numeric amounts must stay strings, so nothing is read as null;
+                # any such value fails the typed read and the row-wise parser below handles the file
+                return FileProcessor._read_csv_table(file_path, null_values=[]).to_pylist()
+            except (pa.ArrowInvalid, pa.ArrowTypeError, OSError):
+                pass
+
         transactions = []
 
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
+                numeric_keys = FileProcessor._numeric_keys(reader.fieldnames or [])
 
                 for row in reader:
                     # Convert numeric fields
-                    transaction = {}
+                    transactions.append(FileProcessor._convert_numeric(row, numeric_keys))
 
-                    for key, value in row.items():
-                        if key.lower() in ['amount', 'risk_score']:
-                            try:
-                                transaction[key] = float(value)
-                            except (ValueError, TypeError):
-                                transaction[key] = value
-                        else:
-                            transaction[key] = value
+            return transactions
 
-                    transactions.append(transaction)
+        except Exception as e:
+            raise ValueError(f"Error processing CSV file: {str(e)}")
 
-            return transactions
+    @staticmethod
+    def _numeric_keys(headers: List[Any]) -> List[Any]:
+        """Header names holding float fields, resolved once per file."""
+        return [h for h in dict.fromkeys(headers) if isinstance(h, str) and h.lower() in NUMERIC_COLUMNS]
+
+    @staticmethod
+    def _convert_numeric(transaction: Dict[Any, Any], numeric_keys: List[Any]) -> Dict[Any, Any]:
+        """Convert the numeric fields in place, keeping values that do not parse."""
+        for key in numeric_keys:
+            if key in transaction:
+                try:
+                    transaction[key] = float(transaction[key])
+                except (ValueError, TypeError):
+                    pass
+        return transaction
 
+    @staticmethod
+    def process_csv_arrow(file_path: str) -> "pa.Table":
+        """Process CSV file into an Arrow table (float amount/risk_score, other columns as text)."""
+        if pa is None:
+            raise ValueError("pyarrow not installed. Install with: pip install pyarrow")
+
+        try:
+            return FileProcessor._read_csv_table(file_path)
         except Exception as e:
             raise ValueError(f"Error processing CSV file: {str(e)}")
 
+    @staticmethod
+    def process_csv_lazy(file_path: str) -> "pl.LazyFrame":
+        """Scan CSV file lazily with polars (float amount/risk_score, other columns as text)."""
+        if pl is None:
+            raise ValueError("polars not installed. Install with: pip install polars")
+
+        try:
+            schema_overrides = {
+                header: pl.Float64 if header.lower() in NUMERIC_COLUMNS else pl.String
+                for header in FileProcessor._csv_headers(file_path)
+            }
+            return pl.scan_csv(file_path, schema_overrides=schema_overrides)
+        except Exception as e:
+            raise ValueError(f"Error processing CSV file: {str(e)}")
+
+    @staticmethod
+    def _csv_headers(file_path: str) -> List[str]:
+        """Column names from the first CSV row."""
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            return next(csv.reader(f), [])
+
+    @staticmethod
+    def _read_csv_table(file_path: str, null_values: Optional[List[str]] = None) -> "pa.Table":
+        """Read a CSV with the multithreaded Arrow parser, typing columns from the header."""
+        column_types = {
+            header: pa.float64() if header.lower() in NUMERIC_COLUMNS else pa.string()
+            for header in FileProcessor._csv_headers(file_path)
+        }
+        convert_options = pacsv.ConvertOptions(column_types=column_types)
+        if null_values is not None:
+            convert_options.null_values = null_values
+        return pacsv.read_csv(file_path, convert_options=convert_options)
+
     @staticmethod
     def process_json(file_path: str) -> List[Dict[str, Any]]:
         """Process JSON file into transaction list."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(file_path, 'rb') as f:
+                data = FileProcessor._json_loads(f.read())
 
             # Handle both array and object responses
             if isinstance(data, list):
@@ -73,20 +173,69 @@ class FileProcessor:
         transactions = []
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        try:
-                            transaction = json.loads(line)
-                            transactions.append(transaction)
-                        except json.JSONDecodeError:
-                            continue
+            with open(file_path, 'rb') as f:
+                # An empty file cannot be memory-mapped
+                if os.fstat(f.fileno()).st_size == 0:
+                    return transactions
+
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    transactions = FileProcessor._parse_json_lines(mm)
 
             return transactions
 
         except Exception as e:
             raise ValueError(f"Error processing JSONL file: {str(e)}")
 
+    @staticmethod
+    def _parse_json_lines(buffer: mmap.mmap) -> List[Any]:
+        """Parse each newline-delimited document in buffer, skipping blank and invalid lines."""
+        # Newline offsets in one vectorized scan; lines are zero-copy slices of the mapping
+        newlines = np.flatnonzero(np.frombuffer(buffer, dtype=np.uint8) == 0x0A)
+        ends = newlines.tolist() + [len(buffer)]
+        del newlines
+
+        parsed = []
+        with memoryview(buffer) as view:
+            start = 0
+            for end in ends:
+                if end > start:
+                    with view[start:end] as line:
+                        try:
+                            parsed.append(FileProcessor._json_loads(line))
+                        except json.JSONDecodeError:
+                            pass
+                start = end + 1
+        return parsed
+
+    @staticmethod
+    def _json_loads(data: bytes) -> Any:
+        """Parse JSON bytes with orjson when available."""
+        if orjson is not None:
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # orjson rejects the NaN/Infinity literals json accepts; let json decide
+                pass
+        return json.loads(bytes(data))
+
+    @staticmethod
+    def process_parquet(file_path: str) -> List[Dict[str, Any]]:
+        """Process Parquet file into transaction list (amount/risk_score cast to float)."""
+        if pa is None:
+            raise ValueError("pyarrow not installed. Install with: pip install pyarrow")
+
+        try:
+            table = pq.read_table(file_path)
+            for i, name in enumerate(table.column_names):
+                if name.lower() in NUMERIC_COLUMNS:
+                    try:
+                        table = table.set_column(i, name, table.column(i).cast(pa.float64()))
+                    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                        pass  # keep columns holding values that do not parse
+            return table.to_pylist()
+        except Exception as e:
+            raise ValueError(f"Error processing Parquet file: {str(e)}")
+
     @staticmethod
     def process_file(file_path: str) -> List[Dict[str, Any]]:
         """Auto-detect file format and process."""
@@ -105,43 +254,100 @@ class FileProcessor:
         elif extension in ['.xlsx', '.xls']:
             return FileProcessor.process_excel(file_path)
 
+        elif extension == '.parquet':
+            return FileProcessor.process_parquet(file_path)
+
         else:
             raise ValueError(f"Unsupported file format: {extension}")
 
+    @staticmethod
+    def process_file_cached(file_path: str, cache_dir: str,
+                            max_entries: int = UPLOAD_CACHE_MAX_ENTRIES) -> List[Dict[str, Any]]:
+        """
+        Process a file, reusing an Arrow IPC snapshot of an earlier parse of identical bytes.
+
+        Snapshots are keyed by content hash and format, and are memory-mapped on reload.
+        The table spans the union of record keys, so records missing a key come back
+        with it set to None, on the first call and on cache hits alike. Batches Arrow
+        cannot type (mixed-type columns, non-record items) are returned uncached.
+        cache_dir is created owner-only and holds at most max_entries snapshots.
+        """
+        if pa is None:
+            return FileProcessor.process_file(file_path)
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        extension = Path(file_path).suffix.lower().lstrip('.')
+        cache_path = Path(cache_dir) / f"{digest.hexdigest()}-{extension}.arrow"
+
+        if cache_path.exists():
+            with pa.memory_map(str(cache_path)) as source:
+                table = pa.ipc.open_file(source).read_all()
+            os.utime(cache_path)  # mark as recently used
+            return table.to_pylist()
+
+        transactions = FileProcessor.process_file(file_path)
+        if not transactions:
+            return transactions
+        try:
+            # from_pylist would take the schema from the first record only
+            table = pa.Table.from_struct_array(pa.array(transactions))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, TypeError):
+            return transactions
+
+        # Write to a unique file beside the target and rename, so concurrent writers
+        # of the same digest never share a partial file and readers never map one
+        cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_path.parent, suffix='.partial', delete=False) as tmp:
+            partial_path = tmp.name
+        try:
+            with pa.OSFile(partial_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(partial_path, cache_path)
+        except BaseException:
+            os.unlink(partial_path)
+            raise
+
+        FileProcessor._evict_snapshots(cache_path.parent, max_entries)
+        return table.to_pylist()
+
+    @staticmethod
+    def _evict_snapshots(cache_dir: Path, max_entries: int) -> None:
+        """Delete the least recently used snapshots beyond max_entries."""
+        snapshots = []
+        for path in cache_dir.glob('*.arrow'):
+            try:
+                snapshots.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                pass  # evicted by a concurrent writer
+        snapshots.sort()
+        for _, path in snapshots[:max(len(snapshots) - max_entries, 0)]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
     @staticmethod
     def process_excel(file_path: str) -> List[Dict[str, Any]]:
         """Process Excel file into transaction list."""
         try:
-            import openpyxl
-
-            workbook = openpyxl.load_workbook(file_path)
-            sheet = workbook.active
+            rows = FileProcessor._read_excel_rows(file_path)
             transactions = []
+            if not rows:
+                return transactions
 
             # Get headers from first row
-            headers = []
-            for cell in sheet[1]:
-                headers.append(cell.value)
+            headers = list(rows[0])
+            numeric_keys = FileProcessor._numeric_keys(headers)
 
             # Read data rows
-            for row in sheet.iter_rows(min_row=2, values_only=True):
+            for row in rows[1:]:
                 if any(cell is not None for cell in row):
-                    transaction = {}
-
-                    for i, header in enumerate(headers):
-                        if i < len(row):
-                            value = row[i]
-
-                            # Convert numeric fields
-                            if header and header.lower() in ['amount', 'risk_score']:
-                                try:
-                                    transaction[header] = float(value)
-                                except (ValueError, TypeError):
-                                    transaction[header] = value
-                            else:
-                                transaction[header] = value
-
-                    transactions.append(transaction)
+                    # Convert numeric fields
+                    transactions.append(FileProcessor._convert_numeric(dict(zip(headers, row)), numeric_keys))
 
             return transactions
 
@@ -150,6 +356,51 @@ class FileProcessor:
         except Exception as e:
             raise ValueError(f"Error processing Excel file: {str(e)}")
 
+    @staticmethod
+    def _read_excel_rows(file_path: str) -> List[List[Any]]:
+        """Cell values of the first worksheet, row by row starting at row 1."""
+        if CalamineWorkbook is not None:
+            # Rust reader; cells are normalized to the values openpyxl would return
+            workbook = CalamineWorkbook.from_path(file_path)
+            sheet_index = FileProcessor._active_sheet_index(file_path)
+            if sheet_index >= len(workbook.sheet_names):
+                sheet_index = 0
+            sheet = workbook.get_sheet_by_index(sheet_index)
+            return [
+                [FileProcessor._calamine_cell(value) for value in row]
+                for row in sheet.to_python(skip_empty_area=False)
+            ]
+
+        import openpyxl
+
+        sheet = openpyxl.load_workbook(file_path).active
+        return list(sheet.iter_rows(min_row=1, values_only=True))
+
+    @staticmethod
+    def _active_sheet_index(file_path: str) -> int:
+        """Index of the sheet openpyxl opens as active (0 when the workbook does not say)."""
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                root = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+            return 0  # legacy .xls or no workbook part
+        view = root.find(f'{SPREADSHEETML_NS}bookViews/{SPREADSHEETML_NS}workbookView')
+        try:
+            return int(view.get('activeTab', 0)) if view is not None else 0
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def _calamine_cell(value: Any) -> Any:
+        """Map a calamine cell to openpyxl's value (None for empty, int for whole numbers)."""
+        if value == '':
+            return None
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if type(value) is date:
+            return datetime.combine(value, time())
+        return value
+
     @staticmethod
     def validate_transactions(transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Validate transaction data quality."""
@@ -169,20 +420,22 @@ class FileProcessor:
             'merchant_id'
         ]
 
-        valid_count = 0
-
-        for i, txn in enumerate(transactions):
-            missing = [f for f in required_fields if f not in txn or txn[f] is None]
-
-            if not missing:
-                valid_count += 1
-            else:
-                report["invalid_records"] += 1
-                report["issues"].append({
-                    "record": i,
-                    "missing_fields": missing
-                })
-
+        if not transactions:
+            return report
+
+        # Absent keys and None values both show up as NA in the required-field frame
+        missing = pd.DataFrame(transactions, columns=required_fields).isna().to_numpy()
+        invalid = np.flatnonzero(missing.any(axis=1))
+        valid_count = len(transactions) - len(invalid)
+
+        report["invalid_records"] = len(invalid)
+        report["issues"] = [
+            {
+                "record": i,
+                "missing_fields": [f for f, is_missing in zip(required_fields, missing[i]) if is_missing]
+            }
+            for i in invalid.tolist()
+        ]
         report["valid_records"] = valid_count
 
         # Calculate quality score
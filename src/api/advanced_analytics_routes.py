@@ -9,12 +9,186 @@ Provides:
 - Comprehensive reporting
 """
 
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from dataclasses import asdict as dc_asdict
 from fastapi import APIRouter, HTTPException
-from typing import Dict, List, Any, Optional
+from itertools import compress
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from src.analytics import AdvancedAnalyticsEngine, DenialAnalysis
+from src.api.responses import FastJSONResponse
 
-router = APIRouter(prefix="/analytics", tags=["Advanced Analytics"])
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+router = APIRouter(prefix="/analytics", tags=["Advanced Analytics"], default_response_class=FastJSONResponse)
+
+# Loaded engines keyed by payload hash, so a dashboard posting the same batch
+# to several endpoints only builds the frame and features once.
+ENGINE_CACHE_SIZE = 32
+_engine_cache: "OrderedDict[str, AdvancedAnalyticsEngine]" = OrderedDict()
+
+
+def _payload_key(transactions: List[Dict[str, Any]]) -> str:
+    """Stable digest of a transaction payload"""
+    if orjson is not None:
+        data = orjson.dumps(transactions)
+    else:
+        data = json.dumps(transactions, separators=(',', ':'), default=str).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _get_engine(payload_key: str, transactions: List[Dict[str, Any]]) -> AdvancedAnalyticsEngine:
+    """Return the loaded engine for a payload, building it on a cache miss"""
+    engine = _engine_cache.get(payload_key)
+    if engine is not None:
+        _engine_cache.move_to_end(payload_key)
+        return engine
+
+    engine = AdvancedAnalyticsEngine()
+    engine.load_transactions(transactions)
+    _engine_cache[payload_key] = engine
+    if len(_engine_cache) > ENGINE_CACHE_SIZE:
+        _engine_cache.popitem(last=False)
+    return engine
+
+
+AMOUNT_BUCKETS = 5
+
+
+def _float_column(transactions: List[Dict[str, Any]], key: str) -> "pa.Array":
+    """Arrow float64 column for a key, coercing unparseable values to null"""
+    values = [t.get(key) for t in transactions]
+    try:
+        return pa.array(values, type=pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array(pd.to_numeric(pd.Series(values, dtype=object), errors='coerce'), type=pa.float64())
+
+
+def _float_values(transactions: List[Dict[str, Any]], key: str) -> np.ndarray:
+    """float64 values for a key; missing and unparseable values become NaN"""
+    values = [t.get(key) for t in transactions]
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+
+def _nanmean(values: np.ndarray) -> float:
+    """Mean of the non-NaN values, NaN when there are none (no empty-slice warning)"""
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if values.size else float('nan')
+
+
+def _timestamp_column(transactions: List[Dict[str, Any]]) -> "pa.Array":
+    """Arrow UTC timestamp column, falling back to pandas for non-ISO strings"""
+    values = [t.get('timestamp') for t in transactions]
+    try:
+        return pc.cast(pa.array(values, type=pa.string()), pa.timestamp('ms', 'UTC'))
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pa.array(pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', utc=True))
+
+
+def _grouped_risk(table: "pa.Table", key: str, stats: List[str],
+                  labels: Optional[List[str]] = None) -> Dict[str, Dict[Any, Any]]:
+    """Aggregate risk_score per non-null key into {stat: {key: value}}"""
+    table = table.filter(pc.is_valid(table[key]))
+    grouped = table.group_by(key).aggregate([('risk_score', stat) for stat in stats]).sort_by(key)
+    keys = grouped[key].to_pylist()
+    if labels is not None:
+        keys = [labels[k] for k in keys]
+    return {
+        stat: dict(zip(keys, grouped[f'risk_score_{stat}'].to_pylist()))
+        for stat in stats
+    }
+
+
+def _risk_heatmap_arrow(transactions: List[Dict[str, Any]]) -> Tuple[Dict, Dict]:
+    """Hour and amount-bucket risk aggregates computed with pyarrow.compute"""
+    amounts = _float_column(transactions, 'amount')
+    table = pa.table({
+        'amount': amounts,
+        'risk_score': _float_column(transactions, 'risk_score'),
+    })
+
+    # Hour-based analysis
+    if any('timestamp' in t for t in transactions):
+        table = table.append_column('hour', pc.hour(_timestamp_column(transactions)))
+        hour_risk = _grouped_risk(table, 'hour', ['mean', 'count', 'max'])
+    else:
+        hour_risk = {}
+
+    # Amount-based analysis: equal-width, right-closed buckets over the observed range
+    low, high = pc.min_max(amounts).values()
+    low, high = low.as_py(), high.as_py()
+    if low is None:
+        return hour_risk, {}
+
+    width = (high - low) / AMOUNT_BUCKETS or 1.0
+    bucket = pc.subtract(pc.ceil(pc.divide(pc.subtract(amounts, low), width)), 1)
+    # skip_nulls=False keeps rows without an amount out of the first bucket
+    bucket = pc.max_element_wise(bucket, 0, skip_nulls=False)
+    bucket = pc.cast(pc.min_element_wise(bucket, AMOUNT_BUCKETS - 1, skip_nulls=False), pa.int8())
+    amount_risk = _grouped_risk(table.append_column('amount_bucket', bucket),
+                                'amount_bucket', ['mean', 'count'], _amount_bucket_labels(low, width))
+    return hour_risk, amount_risk
+
+
+def _risk_heatmap_pandas(transactions: List[Dict[str, Any]]) -> Tuple[Dict, Dict]:
+    """pandas fallback for _risk_heatmap_arrow when pyarrow is not installed"""
+    amounts = _float_values(transactions, 'amount')
+    risk_scores = _float_values(transactions, 'risk_score')
+
+    if any('timestamp' in t for t in transactions):
+        timestamps = pd.to_datetime(pd.Series([t.get('timestamp') for t in transactions], dtype=object),
+                                    errors='coerce', utc=True)
+        hours = timestamps.dt.hour.to_numpy(dtype=float, na_value=np.nan)
+        hour_risk = _grouped_risk_values(hours, risk_scores, ['mean', 'count', 'max'])
+    else:
+        hour_risk = {}
+
+    if np.isnan(amounts).all():
+        return hour_risk, {}
+
+    low, high = float(np.nanmin(amounts)), float(np.nanmax(amounts))
+    width = (high - low) / AMOUNT_BUCKETS or 1.0
+    bucket = np.clip(np.ceil((amounts - low) / width) - 1, 0, AMOUNT_BUCKETS - 1)
+    amount_risk = _grouped_risk_values(bucket, risk_scores, ['mean', 'count'],
+                                       _amount_bucket_labels(low, width))
+    return hour_risk, amount_risk
+
+
+def _amount_bucket_labels(low: float, width: float) -> List[str]:
+    """Interval labels for the equal-width amount buckets"""
+    edges = [low + width * i for i in range(AMOUNT_BUCKETS + 1)]
+    return [f"({edges[i]:.2f}, {edges[i + 1]:.2f}]" for i in range(AMOUNT_BUCKETS)]
+
+
+def _grouped_risk_values(keys: np.ndarray, risk_scores: np.ndarray, stats: List[str],
+                         labels: Optional[List[str]] = None) -> Dict[str, Dict[Any, Any]]:
+    """pandas equivalent of _grouped_risk over float keys, NaN keys dropped"""
+    valid = ~np.isnan(keys)
+    grouped = pd.Series(risk_scores[valid]).groupby(keys[valid].astype(np.int64)).agg(stats)
+    index = grouped.index.tolist()
+    if labels is not None:
+        index = [labels[k] for k in index]
+    return {
+        stat: dict(zip(index, grouped[stat].tolist()))
+        for stat in stats
+    }
 
 
 @router.post("/denials")
@@ -34,8 +208,7 @@ async def analyze_denials(transactions: List[Dict[str, Any]]):
         raise HTTPException(status_code=400, detail="No transactions provided")
 
     try:
-        engine = AdvancedAnalyticsEngine()
-        engine.load_transactions(transactions)
+        engine = _get_engine(_payload_key(transactions), transactions)
         denials = engine.analyze_denials()
 
         return {
@@ -67,18 +240,26 @@ async def customer_analytics(transactions: List[Dict[str, Any]]):
         raise HTTPException(status_code=400, detail="No transactions provided")
 
     try:
-        engine = AdvancedAnalyticsEngine()
-        engine.load_transactions(transactions)
+        engine = _get_engine(_payload_key(transactions), transactions)
         profiles = engine.get_customer_analytics()
         top_risks = engine.get_top_risk_customers(10)
 
+        # One pass builds the payload and both aggregates
+        profile_dicts, total_risk, high_risk_count = [], 0.0, 0
+        for p in profiles.values():
+            profile_dicts.append(asdict(p))
+            total_risk += p.avg_risk_score
+            if p.is_high_risk:
+                high_risk_count += 1
+        total_customers = len(profile_dicts)
+
         return {
             "status": "success",
-            "total_customers": len(profiles),
-            "profiles": [asdict(p) for p in profiles.values()],
+            "total_customers": total_customers,
+            "profiles": profile_dicts,
             "top_risk_customers": top_risks,
-            "average_risk_score": sum(p.avg_risk_score for p in profiles.values()) / len(profiles) if profiles else 0.0,
-            "high_risk_count": sum(1 for p in profiles.values() if p.is_high_risk),
+            "average_risk_score": total_risk / total_customers if total_customers else 0.0,
+            "high_risk_count": high_risk_count,
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -101,8 +282,7 @@ async def transaction_metrics(transactions: List[Dict[str, Any]]):
         raise HTTPException(status_code=400, detail="No transactions provided")
 
     try:
-        engine = AdvancedAnalyticsEngine()
-        engine.load_transactions(transactions)
+        engine = _get_engine(_payload_key(transactions), transactions)
 
         return {
             "status": "success",
@@ -128,25 +308,10 @@ async def risk_heatmap(transactions: List[Dict[str, Any]]):
         raise HTTPException(status_code=400, detail="No transactions provided")
 
     try:
-        import pandas as pd
-        import numpy as np
-
-        df = pd.DataFrame(transactions)
-
-        # Hour-based analysis
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-            hour_risk = df.groupby(df['timestamp'].dt.hour).agg({
-                'risk_score': ['mean', 'count', 'max']
-            }).to_dict()
+        if pa is None:
+            hour_risk, amount_risk = _risk_heatmap_pandas(transactions)
         else:
-            hour_risk = {}
-
-        # Amount-based analysis
-        df['amount_bucket'] = pd.cut(pd.to_numeric(df['amount'], errors='coerce'), bins=5)
-        amount_risk = df.groupby('amount_bucket').agg({
-            'risk_score': ['mean', 'count']
-        }).to_dict()
+            hour_risk, amount_risk = _risk_heatmap_arrow(transactions)
 
         return {
             "status": "success",
@@ -174,13 +339,11 @@ async def denial_patterns(transactions: List[Dict[str, Any]]):
         raise HTTPException(status_code=400, detail="No transactions provided")
 
     try:
-        import pandas as pd
-        from collections import Counter
-
-        df = pd.DataFrame(transactions)
-        denied = df[df['decision'].str.lower() == 'block'] if 'decision' in df.columns else pd.DataFrame()
+        decisions = [t.get('decision') for t in transactions]
+        denied = np.array([isinstance(d, str) and d.lower() == 'block' for d in decisions], dtype=bool)
+        n_denied = int(np.count_nonzero(denied))
 
-        if denied.empty:
+        if n_denied == 0:
             return {
                 "status": "success",
                 "total_denials": 0,
@@ -189,27 +352,30 @@ async def denial_patterns(transactions: List[Dict[str, Any]]):
                 "timestamp": datetime.utcnow().isoformat()
             }
 
-        # Analyze denial patterns
-        reason_counts = Counter(denied['decision'].values) if 'decision' in denied.columns else Counter()
+        # Analyze denial patterns; only denied rows are converted
+        denied_rows = list(compress(transactions, denied))
+        amt = _float_values(denied_rows, 'amount')
+        rsk = _float_values(denied_rows, 'risk_score')
         amount_stats = {
-            "mean": float(pd.to_numeric(denied['amount'], errors='coerce').mean()),
-            "median": float(pd.to_numeric(denied['amount'], errors='coerce').median()),
-            "max": float(pd.to_numeric(denied['amount'], errors='coerce').max()),
-            "min": float(pd.to_numeric(denied['amount'], errors='coerce').min())
+            "mean": float(np.nanmean(amt)),
+            "median": float(np.nanmedian(amt)),
+            "max": float(np.nanmax(amt)),
+            "min": float(np.nanmin(amt))
         }
 
-        high_risk_count = len(denied[pd.to_numeric(denied.get('risk_score', 0), errors='coerce') > 0.7])
+        high_value_count = int(np.count_nonzero(amt > 5000))
+        high_risk_count = int(np.count_nonzero(rsk > 0.7))
 
         patterns = [
             {
                 "pattern": "High-value denials",
-                "count": len(denied[pd.to_numeric(denied['amount'], errors='coerce') > 5000]),
-                "percentage": len(denied[pd.to_numeric(denied['amount'], errors='coerce') > 5000]) / len(denied) * 100 if len(denied) > 0 else 0
+                "count": high_value_count,
+                "percentage": high_value_count / n_denied * 100
             },
             {
                 "pattern": "High-risk entities",
                 "count": high_risk_count,
-                "percentage": high_risk_count / len(denied) * 100 if len(denied) > 0 else 0
+                "percentage": high_risk_count / n_denied * 100
             }
         ]
 
@@ -222,7 +388,7 @@ async def denial_patterns(transactions: List[Dict[str, Any]]):
 
         return {
             "status": "success",
-            "total_denials": len(denied),
+            "total_denials": n_denied,
             "amount_statistics": amount_stats,
             "patterns": patterns,
             "recommendations": recommendations,
@@ -248,14 +414,10 @@ async def compliance_report(transactions: List[Dict[str, Any]]):
         raise HTTPException(status_code=400, detail="No transactions provided")
 
     try:
-        import pandas as pd
-
-        df = pd.DataFrame(transactions)
-
-        # Calculate statistics
-        total = len(df)
-        large_txns = len(df[pd.to_numeric(df.get('amount', 0), errors='coerce') > 10000])
-        high_risk = len(df[pd.to_numeric(df.get('risk_score', 0), errors='coerce') > 0.8])
+        # Calculate statistics; each count is one comparison and popcount over a float column
+        total = len(transactions)
+        large_txns = int(np.count_nonzero(_float_values(transactions, 'amount') > 10000))
+        high_risk = int(np.count_nonzero(_float_values(transactions, 'risk_score') > 0.8))
 
         report = {
             "status": "success",
@@ -298,24 +460,22 @@ async def predictive_insights(transactions: List[Dict[str, Any]]):
         raise HTTPException(status_code=400, detail="No transactions provided")
 
     try:
-        import pandas as pd
-        import numpy as np
+        risk_scores = _float_values(transactions, 'risk_score')
+        scored = risk_scores[~np.isnan(risk_scores)]
 
-        df = pd.DataFrame(transactions)
-
-        # Basic trend analysis
-        if len(df) >= 2:
-            risk_scores = pd.to_numeric(df.get('risk_score', 0), errors='coerce')
-            trend = "increasing" if risk_scores.iloc[-5:].mean() > risk_scores.iloc[:5].mean() else "stable" if risk_scores.iloc[-5:].mean() >= risk_scores.iloc[:5].mean() * 0.95 else "decreasing"
-        else:
+        # Basic trend analysis; fewer than two rows or no scores at all have no trend
+        if len(risk_scores) < 2 or not scored.size:
             trend = "insufficient_data"
+        else:
+            recent, early = _nanmean(risk_scores[-5:]), _nanmean(risk_scores[:5])
+            trend = "increasing" if recent > early else "stable" if recent >= early * 0.95 else "decreasing"
 
         return {
             "status": "success",
             "trend": trend,
             "forecast": {
-                "expected_denial_rate": float(pd.to_numeric(df.get('risk_score', 0), errors='coerce').mean() * 100),
-                "high_risk_forecast": len(df[pd.to_numeric(df.get('risk_score', 0), errors='coerce') > 0.7]),
+                "expected_denial_rate": float(scored.mean() * 100) if scored.size else None,
+                "high_risk_forecast": int(np.count_nonzero(scored > 0.7)),
                 "confidence": 0.75
             },
             "recommendations": [
@@ -332,6 +492,5 @@ async def predictive_insights(transactions: List[Dict[str, Any]]):
 def asdict(obj):
     """Simple asdict fallback for dataclasses"""
     if hasattr(obj, '__dataclass_fields__'):
-        from dataclasses import asdict as dc_asdict
         return dc_asdict(obj)
     return obj.__dict__ if hasattr(obj, '__dict__') else {}
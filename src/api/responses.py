@@ -0,0 +1,32 @@
+"""
+Response classes shared by the API modules.
+"""
+
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def json_line(content: Any) -> bytes:
+    """Serialize one NDJSON record, newline included."""
+    if orjson is None:
+        return json.dumps(content, separators=(",", ":")).encode("utf-8") + b"\n"
+    return orjson.dumps(content, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when installed, else the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        # NaN/inf render as null instead of failing the request
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
@@ -5,22 +5,29 @@ Exposes the decision engine via HTTP endpoints for real-time transaction scoring
 Deploy on cloud platforms (Heroku, AWS, Google Cloud, Azure, etc.)
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, File, UploadFile
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, File, Header, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from pathlib import Path
+import asyncio
 import uvicorn
 import time
 import os
 import tempfile
 import shutil
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-from src.core.decision_engine import RiskDecisionEngine, DecisionType, RiskLevel
+from src.core.decision_engine import RiskDecisionEngine, RiskDecision, DecisionType, RiskLevel
 from src.analytics import AIInsightsEngine, FileProcessor, AdvancedFraudDetectionEngine
+from src.api.responses import NDJSON_MEDIA_TYPE, FastJSONResponse, json_line
 
 
 # ============================================================================
@@ -29,6 +36,8 @@ from src.analytics import AIInsightsEngine, FileProcessor, AdvancedFraudDetectio
 
 class TransactionRequest(BaseModel):
     """Request model for transaction scoring."""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     transaction_id: str = Field(..., description="Unique transaction ID")
     amount: float = Field(..., gt=0, description="Transaction amount")
     currency: str = Field(default="USD", description="Currency code")
@@ -42,6 +51,8 @@ class TransactionRequest(BaseModel):
 
 class DecisionResponse(BaseModel):
     """Response model for decision result."""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     decision: str = Field(..., description="allow/block/review")
     risk_score: float = Field(..., ge=0, le=1, description="Risk score 0-1")
     risk_level: str = Field(..., description="low/medium/high")
@@ -146,7 +157,8 @@ app = FastAPI(
     description="Real-time transaction scoring & fraud detection for fintech payments",
     version="1.0.0",
     docs_url="/api-docs",  # Swagger UI (custom path)
-    redoc_url="/api-redoc"  # ReDoc UI (custom path)
+    redoc_url="/api-redoc",  # ReDoc UI (custom path)
+    default_response_class=FastJSONResponse
 )
 
 # Add CORS for web access
@@ -158,6 +170,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in: when set, parsed uploads are snapshotted here as Arrow IPC, keyed by content hash.
+# Snapshots hold the uploaded transaction data; use a private, non-shared directory.
+UPLOAD_CACHE_DIR = os.environ.get("RISK_AGENT_UPLOAD_CACHE_DIR")
+
 # Initialize decision engine (lazy loaded to avoid startup delays)
 engine = None
 
@@ -172,6 +188,69 @@ def get_engine():
             engine = None
     return engine
 
+# Worker pool for /batch-score; scoring runs off the event loop, one slice per worker
+SCORING_WORKERS = os.cpu_count() or 1
+_scoring_pool = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="batch-score")
+# Smallest slice handed to a worker; below this the executor hop dominates
+BATCH_SLICE_MIN = 64
+
+
+def _score_requests(decision_engine: RiskDecisionEngine, requests: List["TransactionRequest"],
+                    default_timestamp: str) -> List[Dict[str, Any]]:
+    """Score a slice of batch requests into decision summaries."""
+    decisions = []
+    for req in requests:
+        decision = decision_engine.score_transaction(
+            transaction={
+                "id": req.transaction_id,
+                "amount": req.amount,
+                "currency": req.currency,
+                "merchant_id": req.merchant_id,
+                "user_id": req.user_id
+            },
+            context={
+                "device_id": req.device_id,
+                "ip_address": req.ip_address,
+                "user_country": req.user_country,
+                "timestamp": req.timestamp or default_timestamp
+            }
+        )
+        decisions.append({
+            "transaction_id": req.transaction_id,
+            "decision": decision.decision.value,
+            "risk_score": decision.risk_score,
+            "reason_codes": decision.reason_codes
+        })
+    return decisions
+
+# Allowed /score decisions kept for identical replayed payloads (same transaction, same fields)
+SCORE_CACHE_SIZE = 50_000
+SCORE_CACHE_TTL_SECONDS = 30.0
+_score_cache: "OrderedDict[TransactionRequest, Tuple[float, RiskDecision]]" = OrderedDict()
+
+
+def _cached_decision(request: "TransactionRequest") -> Optional[RiskDecision]:
+    """Decision stored for this exact payload, if still within the TTL."""
+    entry = _score_cache.get(request)
+    if entry is None:
+        return None
+    expires_at, decision = entry
+    if expires_at < time.monotonic():
+        del _score_cache[request]
+        return None
+    _score_cache.move_to_end(request)
+    return decision
+
+
+def _cache_decision(request: "TransactionRequest", decision: RiskDecision):
+    _score_cache[request] = (time.monotonic() + SCORE_CACHE_TTL_SECONDS, decision)
+    _score_cache.move_to_end(request)
+    if len(_score_cache) > SCORE_CACHE_SIZE:
+        _score_cache.popitem(last=False)
+
+# Number of recent decisions kept for risk-score and latency statistics
+METRICS_WINDOW = 16384
+
 # Metrics tracking
 class APIMetrics:
     def __init__(self):
@@ -180,16 +259,23 @@ class APIMetrics:
         self.allow_count = 0
         self.block_count = 0
         self.review_count = 0
-        self.risk_scores = []
-        self.latencies = []
+        # Ring buffers over the last METRICS_WINDOW decisions
+        self.risk_scores = np.zeros(METRICS_WINDOW)
+        self.latencies = np.zeros(METRICS_WINDOW)
+        self._next_slot = 0
         self.start_time = datetime.utcnow()
         self.transaction_history = {}
+        # transaction_id -> record per user and per merchant, in transaction_history order
+        self.user_index: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.merchant_index: Dict[str, Dict[str, Dict[str, Any]]] = {}
 
     def record_decision(self, decision_str: str, risk_score: float, latency: float):
         self.total_requests += 1
         self.total_decisions += 1
-        self.risk_scores.append(risk_score)
-        self.latencies.append(latency)
+        slot = self._next_slot % METRICS_WINDOW
+        self.risk_scores[slot] = risk_score
+        self.latencies[slot] = latency
+        self._next_slot += 1
 
         if decision_str == "allow":
             self.allow_count += 1
@@ -198,18 +284,42 @@ class APIMetrics:
         elif decision_str == "review":
             self.review_count += 1
 
+    def record_history(self, record: Dict[str, Any]):
+        """Store a decision record and keep the user/merchant indexes in step."""
+        transaction_id = record["transaction_id"]
+        previous = self.transaction_history.get(transaction_id)
+        self.transaction_history[transaction_id] = record
+
+        for index, key in ((self.user_index, "user_id"), (self.merchant_index, "merchant_id")):
+            if previous is not None and previous[key] != record[key]:
+                # Re-scored under another owner: the record keeps its original history slot
+                old_entries = index[previous[key]]
+                del old_entries[transaction_id]
+                if not old_entries:
+                    del index[previous[key]]
+                index[record[key]] = {
+                    txn_id: entry for txn_id, entry in self.transaction_history.items()
+                    if entry[key] == record[key]
+                }
+            else:
+                index.setdefault(record[key], {})[transaction_id] = record
+
+    def _window(self, samples: np.ndarray) -> np.ndarray:
+        return samples[:min(self._next_slot, METRICS_WINDOW)]
+
     def get_uptime(self) -> float:
         return (datetime.utcnow() - self.start_time).total_seconds()
 
     def get_avg_risk_score(self) -> float:
-        return sum(self.risk_scores) / len(self.risk_scores) if self.risk_scores else 0.0
+        risk_scores = self._window(self.risk_scores)
+        return float(risk_scores.mean()) if risk_scores.size else 0.0
 
     def get_p95_latency(self) -> float:
-        if not self.latencies:
+        latencies = self._window(self.latencies)
+        if not latencies.size:
             return 0.0
-        sorted_latencies = sorted(self.latencies)
-        idx = int(len(sorted_latencies) * 0.95)
-        return sorted_latencies[idx]
+        idx = int(latencies.size * 0.95)
+        return float(np.partition(latencies, idx)[idx])
 
     def get_approval_rate(self) -> float:
         total = self.total_decisions
@@ -218,6 +328,25 @@ class APIMetrics:
 metrics = APIMetrics()
 
 
+class TimeCache:
+    """ISO timestamp shared by requests arriving within the same resolution window."""
+
+    def __init__(self, resolution_seconds: float):
+        self.resolution_seconds = resolution_seconds
+        self._timestamp = ""
+        self._expires_at = 0.0
+
+    def isoformat(self) -> str:
+        now = time.monotonic()
+        if now >= self._expires_at:
+            self._timestamp = datetime.utcnow().isoformat()
+            self._expires_at = now + self.resolution_seconds
+        return self._timestamp
+
+# Response timestamps for /health, /metrics and /analytics; scoring keeps exact clock reads
+time_cache = TimeCache(resolution_seconds=0.01)
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
@@ -228,7 +357,7 @@ async def health_check():
     return HealthResponse(
         status="healthy",
         version="1.0.0",
-        timestamp=datetime.utcnow().isoformat(),
+        timestamp=time_cache.isoformat(),
         models_loaded=True,
         uptime_seconds=metrics.get_uptime(),
         requests_total=metrics.total_requests
@@ -270,29 +399,37 @@ async def score_transaction(request: TransactionRequest):
         if not decision_engine:
             raise HTTPException(status_code=503, detail="Decision engine not available")
 
-        # Call decision engine
-        decision = decision_engine.score_transaction(
-            transaction={
-                "id": request.transaction_id,
-                "amount": request.amount,
-                "currency": request.currency,
-                "merchant_id": request.merchant_id,
-                "user_id": request.user_id
-            },
-            context={
-                "device_id": request.device_id,
-                "ip_address": request.ip_address,
-                "user_country": request.user_country,
-                "timestamp": request.timestamp or datetime.utcnow().isoformat()
-            }
-        )
+        transaction = {
+            "id": request.transaction_id,
+            "amount": request.amount,
+            "currency": request.currency,
+            "merchant_id": request.merchant_id,
+            "user_id": request.user_id
+        }
+        context = {
+            "device_id": request.device_id,
+            "ip_address": request.ip_address,
+            "user_country": request.user_country,
+            "timestamp": request.timestamp or datetime.utcnow().isoformat()
+        }
+
+        # Replays of an allowed payload within the TTL reuse the original decision
+        # under a new compliance log entry
+        cached = _cached_decision(request)
+        if cached is not None:
+            decision = decision_engine.replay_decision(cached, transaction, context)
+        else:
+            # Call decision engine
+            decision = decision_engine.score_transaction(transaction=transaction, context=context)
+            if decision.decision == DecisionType.ALLOW:
+                _cache_decision(request, decision)
 
         # Record metrics
         elapsed = (time.time() - start_time) * 1000  # Convert to ms
         metrics.record_decision(decision.decision.value, decision.risk_score, elapsed)
 
         # Store in history
-        metrics.transaction_history[request.transaction_id] = {
+        metrics.record_history({
             "transaction_id": request.transaction_id,
             "decision": decision.decision.value,
             "risk_score": decision.risk_score,
@@ -301,7 +438,7 @@ async def score_transaction(request: TransactionRequest):
             "timestamp": decision.timestamp,
             "user_id": request.user_id,
             "merchant_id": request.merchant_id
-        }
+        })
 
         # Convert decision to response
         return DecisionResponse(
@@ -326,47 +463,42 @@ async def score_transaction(request: TransactionRequest):
 @app.post("/batch-score", tags=["Scoring"])
 async def batch_score_transactions(
     requests: List[TransactionRequest],
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    accept: Optional[str] = Header(default=None)
 ):
     """
     Score multiple transactions (batch processing).
 
-    Returns list of decisions for bulk transaction processing.
+    Returns list of decisions for bulk transaction processing. Clients sending
+    `Accept: application/x-ndjson` instead receive one decision per line, streamed
+    as each slice of the batch finishes scoring.
     """
     try:
         decision_engine = get_engine()
         if not decision_engine:
             raise HTTPException(status_code=503, detail="Decision engine not available")
 
-        decisions = []
-        for req in requests:
-            decision = decision_engine.score_transaction(
-                transaction={
-                    "id": req.transaction_id,
-                    "amount": req.amount,
-                    "currency": req.currency,
-                    "merchant_id": req.merchant_id,
-                    "user_id": req.user_id
-                },
-                context={
-                    "device_id": req.device_id,
-                    "ip_address": req.ip_address,
-                    "user_country": req.user_country,
-                    "timestamp": req.timestamp or datetime.utcnow().isoformat()
-                }
-            )
-            decisions.append({
-                "transaction_id": req.transaction_id,
-                "decision": decision.decision.value,
-                "risk_score": decision.risk_score,
-                "reason_codes": decision.reason_codes
-            })
-
-        return {
+        # One clock read per request: default transaction timestamp and response timestamp
+        now = datetime.utcnow().isoformat()
+        loop = asyncio.get_running_loop()
+        slice_size = max(-(-len(requests) // SCORING_WORKERS), BATCH_SLICE_MIN)
+        pending = [
+            loop.run_in_executor(_scoring_pool, _score_requests, decision_engine, requests[i:i + slice_size], now)
+            for i in range(0, len(requests), slice_size)
+        ]
+
+        if accept and NDJSON_MEDIA_TYPE in accept:
+            return StreamingResponse(_stream_decisions(pending), media_type=NDJSON_MEDIA_TYPE)
+
+        slices = await asyncio.gather(*pending)
+        decisions = [decision for scored in slices for decision in scored]
+
+        # Plain JSON values: render directly and skip FastAPI's jsonable_encoder walk
+        return FastJSONResponse({
             "count": len(decisions),
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": now,
             "decisions": decisions
-        }
+        })
 
     except Exception as e:
         raise HTTPException(
@@ -375,6 +507,13 @@ async def batch_score_transactions(
         )
 
 
+async def _stream_decisions(pending: List["asyncio.Future"]):
+    """Yield NDJSON decision lines in request order as each slice completes."""
+    for scored in pending:
+        for decision in await scored:
+            yield json_line(decision)
+
+
 @app.get("/metrics", response_model=MetricsResponse, tags=["Analytics"])
 async def get_metrics():
     """Get real-time metrics and KPIs."""
@@ -387,7 +526,7 @@ async def get_metrics():
         avg_risk_score=round(metrics.get_avg_risk_score(), 4),
         p95_latency_ms=round(metrics.get_p95_latency(), 2),
         approval_rate=round(metrics.get_approval_rate(), 2),
-        timestamp=datetime.utcnow().isoformat()
+        timestamp=time_cache.isoformat()
     )
 
 
@@ -398,28 +537,39 @@ async def get_transaction_history(
     merchant_id: Optional[str] = None
 ):
     """Get transaction decision history with optional filters."""
-    history = list(metrics.transaction_history.values())
-
-    # Filter by user_id if provided
-    if user_id:
-        history = [h for h in history if h["user_id"] == user_id]
-
-    # Filter by merchant_id if provided
-    if merchant_id:
-        history = [h for h in history if h["merchant_id"] == merchant_id]
+    if user_id and merchant_id:
+        # Scan the smaller index, match the other filter
+        by_user = metrics.user_index.get(user_id, {})
+        by_merchant = metrics.merchant_index.get(merchant_id, {})
+        if len(by_user) <= len(by_merchant):
+            records = [h for h in by_user.values() if h["merchant_id"] == merchant_id]
+        else:
+            records = [h for h in by_merchant.values() if h["user_id"] == user_id]
+    elif user_id:
+        records = metrics.user_index.get(user_id, {}).values()
+    elif merchant_id:
+        records = metrics.merchant_index.get(merchant_id, {}).values()
+    else:
+        records = metrics.transaction_history.values()
 
     # Return limited results
-    return {
-        "total": len(history),
+    if limit > 0:
+        transactions = list(islice(reversed(records), limit))[::-1]
+    else:
+        transactions = list(records)[-limit:]
+    # Plain JSON values: render directly and skip FastAPI's jsonable_encoder walk
+    return FastJSONResponse({
+        "total": len(records),
         "limit": limit,
-        "transactions": history[-limit:] if history else []
-    }
+        "transactions": transactions
+    })
 
 
 @app.get("/analytics", tags=["Analytics"])
 async def get_analytics():
     """Get comprehensive analytics dashboard data."""
     total = metrics.total_decisions
+    uptime = metrics.get_uptime()
     return {
         "summary": {
             "total_transactions": total,
@@ -433,10 +583,10 @@ async def get_analytics():
         "performance": {
             "avg_risk_score": round(metrics.get_avg_risk_score(), 4),
             "p95_latency_ms": round(metrics.get_p95_latency(), 2),
-            "uptime_seconds": metrics.get_uptime(),
-            "requests_per_minute": round((metrics.total_requests / (metrics.get_uptime() / 60)) if metrics.get_uptime() > 0 else 0, 2)
+            "uptime_seconds": uptime,
+            "requests_per_minute": round((metrics.total_requests / (uptime / 60)) if uptime > 0 else 0, 2)
         },
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": time_cache.isoformat()
     }
 
 
@@ -479,13 +629,14 @@ async def get_docs():
 @app.post("/upload-and-analyze", response_model=AdvancedAnalysisResponse, tags=["Advanced Analytics"])
 async def upload_and_analyze(file: UploadFile = File(...)):
     """
-    Upload a transaction data file (CSV/JSON/Excel) and get world-class fraud detection analysis.
+    Upload a transaction data file (CSV/JSON/Excel/Parquet) and get world-class fraud detection analysis.
 
     Supported formats:
     - CSV (comma-separated values)
     - JSON (array of transactions)
     - JSONL (JSON Lines format)
     - Excel (XLSX/XLS)
+    - Parquet
 
     Returns comprehensive fraud detection including:
     - Multi-dimensional risk profiling
@@ -502,11 +653,15 @@ async def upload_and_analyze(file: UploadFile = File(...)):
         # Save uploaded file temporarily
         with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp:
             temp_file_path = tmp.name
-            content = await file.read()
-            tmp.write(content)
+            # Copy in 1 MiB chunks on a worker thread, so large uploads are never held in
+            # memory whole and the copy does not stall the event loop
+            await run_in_threadpool(shutil.copyfileobj, file.file, tmp, 1 << 20)
 
         # Process file
-        transactions = FileProcessor.process_file(temp_file_path)
+        if UPLOAD_CACHE_DIR:
+            transactions = FileProcessor.process_file_cached(temp_file_path, UPLOAD_CACHE_DIR)
+        else:
+            transactions = FileProcessor.process_file(temp_file_path)
 
         # Validate data quality
         validation = FileProcessor.validate_transactions(transactions)
@@ -651,6 +806,10 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown."""
+    global _scoring_pool
+    _scoring_pool.shutdown(wait=False, cancel_futures=True)
+    # Workers start lazily, so the replacement holds no threads until the app serves again
+    _scoring_pool = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="batch-score")
     print("[STOP] Risk Decision Engine API stopped")
 
 
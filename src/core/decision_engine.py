@@ -10,8 +10,33 @@ import json
 import uuid
 from datetime import datetime
 from enum import Enum
+from types import MappingProxyType
 from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
+
+
+# Simulated feature store snapshots attached to every enriched transaction (read-only views)
+SIMULATED_VELOCITY_FEATURES = MappingProxyType({
+    "user_txn_count_1h": 2,
+    "user_txn_amount_24h": 450.00,
+    "device_txn_count_1h": 1,
+    "merchant_txn_count_1h": 15
+})
+
+SIMULATED_BEHAVIOR_FEATURES = MappingProxyType({
+    "avg_transaction_amount": 75.00,
+    "avg_time_between_txns_hours": 12.5,
+    "account_age_days": 365,
+    "device_binding_age_days": 30
+})
+
+SIMULATED_DEVICE_FEATURES = MappingProxyType({
+    "device_reputation": 0.95,
+    "ip_reputation": 0.92,
+    "is_vpn": False,
+    "is_proxy": False,
+    "device_mismatch": False
+})
 
 
 class DecisionType(Enum):
@@ -129,28 +154,8 @@ class RiskDecisionEngine:
                 transaction, context, user_profile, device_profile, merchant_profile
             )
 
-            # 2. Score with ML + Rules
-            ml_score, ml_reasons = self._score_ml_model(enriched_features)
-            rules_score, rules_reasons = self._evaluate_rules(enriched_features)
-
-            # 3. Combine scores
-            combined_score, all_reasons = self._combine_scores(
-                ml_score, ml_reasons, rules_score, rules_reasons
-            )
-
-            # 4. Check AML/Sanctions (if enabled)
-            aml_reasons = []
-            if self.config.get("enable_aml_screening"):
-                aml_score, aml_reasons = self._check_aml(enriched_features)
-                combined_score = max(combined_score, aml_score)
-                all_reasons.extend(aml_reasons)
-
-            # 5. Graph analysis for rings/mules (if enabled)
-            graph_reasons = []
-            if self.config.get("enable_graph_analysis"):
-                graph_score, graph_reasons = self._analyze_entity_graph(enriched_features)
-                combined_score = max(combined_score, graph_score)
-                all_reasons.extend(graph_reasons)
+            # 2-5. Score with ML + Rules, AML and graph analysis
+            combined_score, all_reasons = self._score_features(enriched_features)
 
             # 6. Apply decision policy
             decision, risk_level, reason_codes, next_actions = self._apply_decision_policy(
@@ -186,20 +191,71 @@ class RiskDecisionEngine:
 
         except Exception as e:
             print(f"Error in decision engine: {e}")
-            # Fail-safe: escalate to review
-            return RiskDecision(
-                decision=DecisionType.REVIEW,
-                risk_score=0.5,
-                risk_level=RiskLevel.MEDIUM,
-                reasons=[],
-                reason_codes=["ENGINE_ERROR"],
-                next_actions=["MANUAL_REVIEW"],
-                compliance_log_id=compliance_log_id,
-                latency_ms=(time.time() - start_time) * 1000,
-                timestamp=datetime.utcnow().isoformat(),
-                model_version=self.model_version,
-                explanation=f"Decision engine error: {str(e)}"
-            )
+            return self._failsafe_decision(compliance_log_id, (time.time() - start_time) * 1000, e)
+
+    def replay_decision(
+        self,
+        decision: RiskDecision,
+        transaction: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> RiskDecision:
+        """
+        Re-issue an earlier decision for a replayed transaction without re-scoring it.
+
+        The replay gets its own compliance log entry, timestamp and latency; the
+        decision, score and reasons are carried over.
+        """
+        start_time = time.time()
+        replayed = replace(
+            decision,
+            reason_codes=list(decision.reason_codes),
+            next_actions=list(decision.next_actions),
+            compliance_log_id=f"clog_{uuid.uuid4().hex[:8]}",
+            timestamp=datetime.utcnow().isoformat(),
+            latency_ms=0.0
+        )
+        self._log_compliance(replayed, transaction, context)
+        replayed.latency_ms = (time.time() - start_time) * 1000
+        return replayed
+
+    def _score_features(self, features: Dict[str, Any]) -> Tuple[float, List[DecisionReason]]:
+        """Combined model, rules, AML and graph score for enriched features."""
+        ml_score, ml_reasons = self._score_ml_model(features)
+        rules_score, rules_reasons = self._evaluate_rules(features)
+
+        combined_score, all_reasons = self._combine_scores(
+            ml_score, ml_reasons, rules_score, rules_reasons
+        )
+
+        # Check AML/Sanctions (if enabled)
+        if self.config.get("enable_aml_screening"):
+            aml_score, aml_reasons = self._check_aml(features)
+            combined_score = max(combined_score, aml_score)
+            all_reasons.extend(aml_reasons)
+
+        # Graph analysis for rings/mules (if enabled)
+        if self.config.get("enable_graph_analysis"):
+            graph_score, graph_reasons = self._analyze_entity_graph(features)
+            combined_score = max(combined_score, graph_score)
+            all_reasons.extend(graph_reasons)
+
+        return combined_score, all_reasons
+
+    def _failsafe_decision(self, compliance_log_id: str, latency_ms: float, error: Exception) -> RiskDecision:
+        """Fail-safe: escalate to review when scoring raises."""
+        return RiskDecision(
+            decision=DecisionType.REVIEW,
+            risk_score=0.5,
+            risk_level=RiskLevel.MEDIUM,
+            reasons=[],
+            reason_codes=["ENGINE_ERROR"],
+            next_actions=["MANUAL_REVIEW"],
+            compliance_log_id=compliance_log_id,
+            latency_ms=latency_ms,
+            timestamp=datetime.utcnow().isoformat(),
+            model_version=self.model_version,
+            explanation=f"Decision engine error: {str(error)}"
+        )
 
     def _enrich_features(
         self,
@@ -218,28 +274,10 @@ class RiskDecisionEngine:
             "merchant_profile": merchant_profile or {},
         }
 
-        # Simulated feature store lookups
-        enriched["velocity_features"] = {
-            "user_txn_count_1h": 2,
-            "user_txn_amount_24h": 450.00,
-            "device_txn_count_1h": 1,
-            "merchant_txn_count_1h": 15
-        }
-
-        enriched["behavior_features"] = {
-            "avg_transaction_amount": 75.00,
-            "avg_time_between_txns_hours": 12.5,
-            "account_age_days": 365,
-            "device_binding_age_days": 30
-        }
-
-        enriched["device_features"] = {
-            "device_reputation": 0.95,
-            "ip_reputation": 0.92,
-            "is_vpn": False,
-            "is_proxy": False,
-            "device_mismatch": False
-        }
+        # Simulated feature store lookups; the snapshots are shared read-only
+        enriched["velocity_features"] = SIMULATED_VELOCITY_FEATURES
+        enriched["behavior_features"] = SIMULATED_BEHAVIOR_FEATURES
+        enriched["device_features"] = SIMULATED_DEVICE_FEATURES
 
         return enriched
 
@@ -0,0 +1,484 @@
+"""
+Unit tests for the analytics engines.
+"""
+
+import pytest
+from dataclasses import FrozenInstanceError, asdict
+from src.analytics import (
+    AdvancedAnalyticsEngine, AdvancedFraudDetectionEngine, AIInsightsEngine, DenialReason, FileProcessor
+)
+
+
+def make_transactions():
+    """Small mixed batch with sanctions/PEP/anomaly hints."""
+    return [
+        {"transaction_id": "txn_1", "amount": 100.0, "user_id": "usr_a", "user_country": "US",
+         "decision": "allow", "risk_score": 0.10, "timestamp": "2025-10-28T10:00:00Z"},
+        {"transaction_id": "txn_2", "amount": 7500.0, "user_id": "usr_a", "user_country": "RU",
+         "decision": "block", "risk_score": 0.92, "timestamp": "2025-10-28T11:00:00Z"},
+        {"transaction_id": "txn_3", "amount": 50.0, "user_id": "usr_b", "user_country": "US",
+         "decision": "BLOCK", "risk_score": 0.40, "timestamp": "2025-10-28T12:00:00Z",
+         "notes": "Possible SANCTIONS hit"},
+        {"transaction_id": "txn_4", "amount": 2500.0, "user_id": "usr_b", "user_country": "GB",
+         "decision": "block", "risk_score": 0.75, "timestamp": "2025-10-28T13:00:00Z",
+         "notes": "pep relative, anomaly flagged"},
+        {"transaction_id": "txn_5", "amount": 300.0, "user_id": "usr_c", "user_country": "us",
+         "decision": "review", "risk_score": 0.55, "timestamp": "2025-10-28T14:00:00Z"},
+    ]
+
+
+class TestAdvancedAnalyticsEngine:
+    """Test suite for AdvancedAnalyticsEngine."""
+
+    @pytest.fixture
+    def engine(self):
+        """Engine loaded with the sample batch."""
+        engine = AdvancedAnalyticsEngine()
+        engine.load_transactions(make_transactions())
+        return engine
+
+    def test_metrics(self, engine):
+        """Test decision counts are case-insensitive."""
+        assert engine.metrics.total_transactions == 5
+        assert engine.metrics.denied_count == 3
+        assert engine.metrics.approved_count == 1
+        assert engine.metrics.review_count == 1
+
+    def test_derived_features_on_demand(self, engine):
+        """Test temporal/log features are only added when requested."""
+        assert "amount_log" not in engine.df.columns
+
+        df = engine.add_derived_features()
+
+        assert df["hour"].tolist() == [10, 11, 12, 13, 14]
+        assert df["day_of_week"].iloc[0] == "Tuesday"
+        assert df["amount_log"].iloc[0] == pytest.approx(4.6151, abs=1e-4)
+
+    def test_denial_reasons(self, engine):
+        """Test primary reason precedence: sanctions > PEP > risk score."""
+        denials = engine.analyze_denials()
+
+        assert set(denials) == {"txn_2", "txn_3", "txn_4"}
+        assert denials["txn_2"].primary_reason == DenialReason.HIGH_RISK_SCORE.value
+        assert denials["txn_3"].primary_reason == DenialReason.SANCTIONS_MATCH.value
+        assert denials["txn_4"].primary_reason == DenialReason.PEP_MATCH.value
+        assert denials["txn_3"].severity_level == "critical"
+
+    def test_contributing_factors(self, engine):
+        """Test contributing factors and risk signals per denial."""
+        denials = engine.analyze_denials()
+
+        assert denials["txn_2"].contributing_factors == [
+            "Large transaction amount", "International transaction", "High ML risk score"
+        ]
+        assert denials["txn_3"].contributing_factors == []
+        assert "Statistical anomaly detected" in denials["txn_4"].contributing_factors
+        assert [s["severity"] for s in denials["txn_2"].risk_signals] == ["high", "high"]
+        assert [s["severity"] for s in denials["txn_4"].risk_signals] == ["medium", "high"]
+
+    def test_customer_context(self, engine):
+        """Test related transactions and customer history on denials."""
+        denials = engine.analyze_denials()
+
+        assert denials["txn_2"].related_transactions == ["txn_1", "txn_2"]
+        assert denials["txn_2"].customer_history["total_transactions"] == 2
+        assert denials["txn_2"].customer_history["denial_rate"] == 50.0
+
+    def test_repeated_analysis(self, engine):
+        """Test repeated analyze_denials calls do not double count."""
+        first = engine.analyze_denials()
+        txn_2 = first["txn_2"]
+        summary = engine.get_denial_summary()
+
+        assert engine.analyze_denials()["txn_2"] is txn_2
+        assert engine.get_denial_summary() == summary
+        assert sum(summary["denial_reasons_distribution"].values()) == 3
+
+        assert engine.analyze_denials(force=True)["txn_2"] is not txn_2
+        assert engine.get_denial_summary() == summary
+
+    def test_reload_reanalyzes_denials(self, engine):
+        """Test denials re-loaded with new values are analyzed again."""
+        engine.analyze_denials()
+        transactions = make_transactions()
+        transactions[1].update(risk_score=0.99, notes="sanctions list match")
+        engine.load_transactions(transactions)
+
+        analysis = engine.analyze_denials()["txn_2"]
+
+        assert analysis.risk_score == 0.99
+        assert analysis.primary_reason == DenialReason.SANCTIONS_MATCH.value
+
+    def test_denials_without_user_ids(self):
+        """Test denials analyze with empty customer context when user_id is absent."""
+        transactions = make_transactions()
+        for txn in transactions:
+            txn.pop("user_id", None)
+        engine = AdvancedAnalyticsEngine()
+        engine.load_transactions(transactions)
+
+        analysis = engine.analyze_denials()["txn_2"]
+
+        assert analysis.customer_history == {}
+        assert analysis.related_transactions == []
+
+    def test_append_transactions(self, engine):
+        """Test appending in batches matches a single load."""
+        transactions = make_transactions()
+        appended = AdvancedAnalyticsEngine()
+        appended.load_transactions(transactions[:2])
+        appended.analyze_denials()
+        appended.append_transactions(transactions[2:])
+
+        assert appended.get_metrics_summary() == engine.get_metrics_summary()
+        assert set(appended.analyze_denials()) == set(engine.analyze_denials())
+        assert appended.get_denial_summary() == engine.get_denial_summary()
+
+    def test_customer_analytics(self, engine):
+        """Test per-customer profiles."""
+        profiles = engine.get_customer_analytics()
+
+        assert set(profiles) == {"usr_a", "usr_b", "usr_c"}
+        assert profiles["usr_b"].denied_transactions == 2
+        assert profiles["usr_b"].total_spend == 2550.0
+        assert engine.get_top_risk_customers(1)[0]["customer_id"] == "usr_b"
+
+    def test_to_dict_matches_asdict(self, engine):
+        """Test hand-written to_dict stays in sync with the dataclass fields."""
+        profile = engine.get_customer_analytics()["usr_a"]
+
+        assert profile.to_dict() == asdict(profile)
+        assert engine.metrics.to_dict() == asdict(engine.metrics)
+
+    def test_polars_engine_matches_pandas(self, engine):
+        """Test the polars engine produces the same metrics and profiles."""
+        pytest.importorskip("polars")
+        polars_engine = AdvancedAnalyticsEngine(engine="polars")
+        polars_engine.load_transactions(make_transactions())
+
+        assert polars_engine.get_metrics_summary() == pytest.approx(engine.get_metrics_summary())
+        expected = engine.get_customer_analytics()
+        for customer_id, profile in polars_engine.get_customer_analytics().items():
+            assert profile.total_spend == expected[customer_id].total_spend
+            assert profile.denial_rate == expected[customer_id].denial_rate
+            assert profile.avg_risk_score == pytest.approx(expected[customer_id].avg_risk_score)
+
+    def test_unknown_engine(self):
+        """Test unsupported engine names are rejected."""
+        with pytest.raises(ValueError):
+            AdvancedAnalyticsEngine(engine="spark")
+
+
+class TestAdvancedFraudDetectionEngine:
+    """Test suite for AdvancedFraudDetectionEngine."""
+
+    @pytest.fixture
+    def engine(self):
+        """Engine loaded with the sample batch plus a row without a user."""
+        transactions = make_transactions()
+        transactions.append({"transaction_id": "txn_6", "amount": 80.0, "user_id": None,
+                             "decision": "allow", "risk_score": 0.2, "timestamp": "2025-10-28T15:00:00Z"})
+        engine = AdvancedFraudDetectionEngine()
+        engine.load_transactions(transactions)
+        return engine
+
+    def test_risk_profiles(self, engine):
+        """Test one profile per known user with ensemble scores in range."""
+        profiles = engine.calculate_comprehensive_risk_scores()
+
+        assert set(profiles) == {"usr_a", "usr_b", "usr_c"}
+        assert profiles["usr_b"].base_risk_score == pytest.approx(0.575)
+        assert profiles["usr_c"].confidence_score == pytest.approx(0.1)
+        for profile in profiles.values():
+            assert 0.0 <= profile.final_risk_score <= 1.0
+            assert profile.risk_level in ("LOW", "MEDIUM", "HIGH")
+
+    def test_risk_profiles_are_frozen(self, engine):
+        """Test profiles are slotted, immutable and serialize via asdict."""
+        profile = engine.calculate_comprehensive_risk_scores()["usr_a"]
+
+        assert not hasattr(profile, "__dict__")
+        with pytest.raises(FrozenInstanceError):
+            profile.final_risk_score = 0.0
+        assert engine.generate_comprehensive_report()["risk_profiles"]["usr_a"] == asdict(profile)
+
+    def test_risk_profiles_with_colliding_user_ids(self):
+        """Test user ids that stringify alike collapse to the later profile."""
+        transactions = make_transactions()
+        transactions[2]["user_id"] = 1
+        transactions[3]["user_id"] = "1"
+        engine = AdvancedFraudDetectionEngine()
+        engine.load_transactions(transactions)
+
+        profiles = engine.calculate_comprehensive_risk_scores()
+        report = engine.generate_comprehensive_report()
+
+        assert set(profiles) == {"usr_a", "1", "usr_c"}
+        assert report["risk_profiles"]["1"] == asdict(profiles["1"])
+        assert sum(report["summary"][f"{level}_risk_entities"] for level in ("high", "medium", "low")) == 3
+
+    def test_anomaly_scores_follow_flagged_rows(self, engine):
+        """Test entity anomaly scores count each user's flagged transactions."""
+        anomalies = engine.detect_anomalies()
+        profiles = engine.calculate_comprehensive_risk_scores()
+
+        flagged_users = [engine.df["user_id"].iloc[a["index"]] for a in anomalies]
+        for user_id, profile in profiles.items():
+            expected = flagged_users.count(user_id) / len(engine.df[engine.df["user_id"] == user_id])
+            assert profile.anomaly_score == pytest.approx(expected)
+        assert any(p.anomaly_score > 0 for p in profiles.values())
+
+    def test_structuring_pattern(self):
+        """Test many small payments from one user are flagged as structuring."""
+        transactions = [
+            {"transaction_id": f"txn_s{i}", "amount": 900.0, "user_id": "usr_s", "merchant_id": f"mch_{i % 2}",
+             "decision": "allow", "risk_score": 0.3, "timestamp": "2025-10-28T10:00:00Z"}
+            for i in range(6)
+        ]
+        engine = AdvancedFraudDetectionEngine()
+        engine.load_transactions(transactions)
+
+        patterns = engine.detect_money_laundering_patterns()
+
+        assert [p["type"] for p in patterns] == ["Potential Structuring"]
+        assert patterns[0]["user_id"] == "usr_s"
+        assert patterns[0]["transaction_count"] == 6
+        assert patterns[0]["total_amount"] == 5400.0
+
+
+class TestAIInsightsEngine:
+    """Test suite for AIInsightsEngine."""
+
+    @pytest.fixture
+    def insights(self):
+        """Insights for the sample batch keyed by title."""
+        engine = AIInsightsEngine()
+        engine.load_transactions(make_transactions())
+        return {insight.title: insight for insight in engine.analyze()}
+
+    def test_fraud_and_blocked_metrics(self, insights):
+        """Test high-risk and blocked totals (decision match is exact)."""
+        fraud = insights["High Fraud Alert"].metrics
+        assert fraud["high_risk_count"] == 2
+        assert fraud["avg_fraud_amount"] == pytest.approx(5000.0)
+
+        blocked = insights["Blocked Transactions Summary"].metrics
+        assert blocked["blocked_count"] == 2
+        assert blocked["total_blocked_amount"] == pytest.approx(10000.0)
+
+    def test_geographic_pattern(self, insights):
+        """Test per-country high-risk rates pick the worst country."""
+        geo = insights["Geographic Risk Pattern"].metrics
+        assert geo["country"] == "RU"
+        assert geo["high_risk_rate_percent"] == pytest.approx(100.0)
+
+    def test_decision_distribution(self, insights):
+        """Test decision rates over the whole batch."""
+        metrics = insights["Decision Distribution"].metrics
+        assert metrics["approval_rate"] == pytest.approx(20.0)
+        assert metrics["block_rate"] == pytest.approx(40.0)
+        assert metrics["total_transactions"] == 5
+
+    def test_summary(self):
+        """Test the summary counts severities and projects every insight."""
+        engine = AIInsightsEngine()
+        engine.load_transactions(make_transactions())
+        insights = engine.analyze()
+
+        summary = engine.get_summary()
+
+        assert summary["total_insights"] == len(insights)
+        assert summary["critical"] + summary["warning"] + summary["info"] == len(insights)
+        assert summary["insights"][0] == asdict(insights[0])
+        summary["insights"][0]["metrics"]["tampered"] = True
+        summary["insights"].clear()
+        assert len(engine.get_summary()["insights"]) == len(insights)
+        assert "tampered" not in engine.get_summary()["insights"][0]["metrics"]
+
+    def test_lazy_csv_frame_matches_dicts(self, tmp_path):
+        """Test a polars scan of a CSV yields the same insights as its parsed rows."""
+        pytest.importorskip("polars")
+        path = tmp_path / "batch.csv"
+        path.write_text(
+            "transaction_id,amount,user_id,user_country,decision,risk_score\n"
+            "txn_1,100.0,usr_a,US,allow,0.10\n"
+            "txn_2,7500.0,usr_a,RU,block,0.92\n"
+            "txn_3,2500.0,usr_b,GB,block,0.75\n"
+            "txn_4,300.0,usr_c,US,review,0.55\n"
+        )
+        from_dicts = AIInsightsEngine()
+        from_dicts.load_transactions(FileProcessor.process_csv(str(path)))
+        from_dicts.analyze()
+        from_frame = AIInsightsEngine()
+        from_frame.load_frame(FileProcessor.process_csv_lazy(str(path)))
+        from_frame.analyze()
+
+        assert from_frame.get_summary() == from_dicts.get_summary()
+
+    def test_account_takeover_counts_distinct_values(self):
+        """Test per-user distinct countries/devices ignore repeats."""
+        transactions = [
+            {"transaction_id": f"txn_u{i}", "amount": 10.0, "user_id": "usr_t", "merchant_id": "mch_1",
+             "device_id": f"dev_{i % 2}", "user_country": country, "decision": "allow", "risk_score": 0.1}
+            for i, country in enumerate(["US", "GB", "FR", "DE", "US"])
+        ]
+        engine = AIInsightsEngine()
+        engine.load_transactions(transactions)
+
+        insight = next(i for i in engine.analyze() if i.title == "Account Takeover Risk")
+
+        assert insight.metrics == {"user_id": "usr_t", "unique_countries": 4, "unique_devices": 2,
+                                   "unique_merchants": 1, "total_transactions": 5}
+
+
+class TestFileProcessor:
+    """Test suite for FileProcessor."""
+
+    def test_process_csv(self, tmp_path):
+        """Test amount/risk_score become floats and other fields stay strings."""
+        path = tmp_path / "batch.csv"
+        path.write_text("transaction_id,Amount,risk_score,user_id\n001,12.5,0.3,usr_a\n002,7,0.9,usr_b\n")
+
+        assert FileProcessor.process_csv(str(path)) == [
+            {"transaction_id": "001", "Amount": 12.5, "risk_score": 0.3, "user_id": "usr_a"},
+            {"transaction_id": "002", "Amount": 7.0, "risk_score": 0.9, "user_id": "usr_b"},
+        ]
+
+    def test_process_csv_keeps_unparseable_amounts(self, tmp_path):
+        """Test blank or non-numeric amounts are kept as the raw strings."""
+        path = tmp_path / "batch.csv"
+        path.write_text("transaction_id,amount\n1,\n2,n/a\n3,5\n")
+
+        assert [t["amount"] for t in FileProcessor.process_csv(str(path))] == ["", "n/a", 5.0]
+
+    def test_process_csv_arrow(self, tmp_path):
+        """Test the Arrow reader types numeric columns and reads blanks as nulls."""
+        pa = pytest.importorskip("pyarrow")
+        path = tmp_path / "batch.csv"
+        path.write_text("transaction_id,amount\n001,12.5\n002,\n")
+
+        table = FileProcessor.process_csv_arrow(str(path))
+
+        assert table.schema.field("amount").type == pa.float64()
+        assert table.column("transaction_id").to_pylist() == ["001", "002"]
+        assert table.column("amount").to_pylist() == [12.5, None]
+
+    def test_process_file_cached(self, tmp_path):
+        """Test a repeat parse of the same bytes is served from the Arrow snapshot."""
+        pytest.importorskip("pyarrow")
+        path = tmp_path / "batch.csv"
+        path.write_text("transaction_id,amount,user_id\n001,12.5,usr_a\n002,7,usr_b\n")
+        cache_dir = tmp_path / "cache"
+
+        first = FileProcessor.process_file_cached(str(path), str(cache_dir))
+        assert len(list(cache_dir.glob("*.arrow"))) == 1
+
+        path.unlink()
+        (tmp_path / "copy.csv").write_text("transaction_id,amount,user_id\n001,12.5,usr_a\n002,7,usr_b\n")
+        assert FileProcessor.process_file_cached(str(tmp_path / "copy.csv"), str(cache_dir)) == first
+
+    def test_process_parquet(self, tmp_path):
+        """Test Parquet files are read through Arrow with float amounts."""
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+        path = tmp_path / "batch.parquet"
+        pq.write_table(pa.table({"transaction_id": ["001", "002"], "amount": [12, 7]}), path)
+
+        transactions = FileProcessor.process_file(str(path))
+
+        assert transactions == [
+            {"transaction_id": "001", "amount": 12.0},
+            {"transaction_id": "002", "amount": 7.0},
+        ]
+        assert all(isinstance(t["amount"], float) for t in transactions)
+
+    def test_process_file_cached_keeps_keys_missing_from_first_record(self, tmp_path):
+        """Test keys that only later records carry survive the snapshot round trip."""
+        pytest.importorskip("pyarrow")
+        path = tmp_path / "batch.json"
+        path.write_text('[{"transaction_id": "a", "amount": 5},'
+                        ' {"transaction_id": "b", "amount": 7, "risk_score": 0.9, "decision": "block"}]')
+        cache_dir = tmp_path / "cache"
+
+        first = FileProcessor.process_file_cached(str(path), str(cache_dir))
+        cached = FileProcessor.process_file_cached(str(path), str(cache_dir))
+
+        assert first[1]["risk_score"] == 0.9 and first[1]["decision"] == "block"
+        assert cached == first
+        assert not list(cache_dir.glob("*.partial"))
+
+    def test_process_file_cached_evicts_oldest(self, tmp_path):
+        """Test the cache directory is owner-only and bounded to max_entries snapshots."""
+        pytest.importorskip("pyarrow")
+        cache_dir = tmp_path / "cache"
+        for i in range(3):
+            path = tmp_path / f"batch{i}.csv"
+            path.write_text(f"transaction_id,amount\n00{i},1\n")
+            FileProcessor.process_file_cached(str(path), str(cache_dir), max_entries=2)
+
+        assert len(list(cache_dir.glob("*.arrow"))) == 2
+        assert cache_dir.stat().st_mode & 0o777 == 0o700
+
+    def test_process_jsonl_skips_bad_lines(self, tmp_path):
+        """Test blank and malformed lines are skipped; NaN literals still parse."""
+        path = tmp_path / "batch.jsonl"
+        path.write_text('{"transaction_id": "txn_1"}\n\n{bad}\n{"transaction_id": "txn_2", "risk_score": NaN}\n')
+
+        transactions = FileProcessor.process_jsonl(str(path))
+
+        assert [t["transaction_id"] for t in transactions] == ["txn_1", "txn_2"]
+
+    def test_process_excel(self, tmp_path):
+        """Test Excel rows keep cell types, skip empty rows and parse amounts."""
+        openpyxl = pytest.importorskip("openpyxl")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["transaction_id", "amount", "user_id"])
+        sheet.append([1001, "12.5", "usr_a"])
+        sheet.append([None, None, None])
+        sheet.append([1002, 40, None])
+        path = tmp_path / "batch.xlsx"
+        workbook.save(path)
+
+        assert FileProcessor.process_excel(str(path)) == [
+            {"transaction_id": 1001, "amount": 12.5, "user_id": "usr_a"},
+            {"transaction_id": 1002, "amount": 40.0, "user_id": None},
+        ]
+
+    def test_process_excel_reads_active_sheet(self, tmp_path):
+        """Test the sheet saved as active is read, not the first one."""
+        openpyxl = pytest.importorskip("openpyxl")
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["transaction_id"])
+        workbook.active.append(["ignored"])
+        sheet = workbook.create_sheet("Transactions")
+        sheet.append(["transaction_id", "amount"])
+        sheet.append(["txn_1", 5])
+        workbook.active = 1
+        path = tmp_path / "batch.xlsx"
+        workbook.save(path)
+
+        assert FileProcessor.process_excel(str(path)) == [{"transaction_id": "txn_1", "amount": 5.0}]
+
+    def test_validate_transactions(self):
+        """Test missing keys and None values make a record invalid."""
+        transactions = [
+            {"transaction_id": "txn_1", "amount": 10.0, "user_id": "usr_a", "merchant_id": "mch_1"},
+            {"transaction_id": "txn_2", "amount": None, "user_id": "usr_a"},
+            {"transaction_id": "txn_3", "amount": 0.0, "user_id": "", "merchant_id": "mch_1"},
+        ]
+
+        report = FileProcessor.validate_transactions(transactions)
+
+        assert report["valid_records"] == 2
+        assert report["invalid_records"] == 1
+        assert report["issues"] == [{"record": 1, "missing_fields": ["amount", "merchant_id"]}]
+        assert report["data_quality_score"] == pytest.approx(200 / 3)
+
+    def test_validate_transactions_itemizes_every_invalid_record(self):
+        """Test every invalid record is listed in the issues."""
+        transactions = [{"transaction_id": f"txn_{i}"} for i in range(1500)]
+
+        report = FileProcessor.validate_transactions(transactions)
+
+        assert report["invalid_records"] == len(report["issues"]) == 1500
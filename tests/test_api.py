@@ -0,0 +1,182 @@
+"""
+API tests for the transaction scoring endpoints.
+"""
+
+import json
+import pytest
+from collections import OrderedDict
+from fastapi.testclient import TestClient
+
+import src.api.transaction_handler as handler
+from src.core.decision_engine import RiskDecisionEngine
+
+
+def make_request(transaction_id="txn_1", **overrides):
+    """Valid /score payload."""
+    payload = {
+        "transaction_id": transaction_id,
+        "amount": 100.0,
+        "merchant_id": "mch_1",
+        "user_id": "usr_1",
+        "device_id": "dev_1",
+        "ip_address": "10.0.0.1",
+    }
+    payload.update(overrides)
+    return payload
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Fresh decision engine behind the API."""
+    engine = RiskDecisionEngine()
+    monkeypatch.setattr(handler, "engine", engine)
+    return engine
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    """Client over an API with empty metrics, history and score cache."""
+    monkeypatch.setattr(handler, "metrics", handler.APIMetrics())
+    monkeypatch.setattr(handler, "_score_cache", OrderedDict())
+    return TestClient(handler.app)
+
+
+class TestScoreCache:
+    """Replayed /score payloads."""
+
+    def test_replay_gets_new_compliance_entry(self, client, engine, monkeypatch):
+        """Test a replay reuses the decision but is logged under a new compliance id."""
+        logged = []
+        monkeypatch.setattr(engine, "_log_compliance", lambda decision, *args: logged.append(decision))
+
+        first = client.post("/score", json=make_request()).json()
+        replay = client.post("/score", json=make_request()).json()
+
+        assert replay["decision"] == first["decision"]
+        assert replay["risk_score"] == first["risk_score"]
+        assert replay["compliance_log_id"] != first["compliance_log_id"]
+        assert [d.compliance_log_id for d in logged] == [first["compliance_log_id"], replay["compliance_log_id"]]
+        assert len(handler._score_cache) == 1
+        history = client.get("/history").json()["transactions"]
+        assert history[-1]["timestamp"] == replay["timestamp"]
+
+    def test_expired_entry_is_rescored(self, client, engine, monkeypatch):
+        """Test entries past the TTL are scored again."""
+        monkeypatch.setattr(handler, "SCORE_CACHE_TTL_SECONDS", -1.0)
+        scored = []
+        score_transaction = engine.score_transaction
+        monkeypatch.setattr(engine, "score_transaction", lambda **kw: scored.append(1) or score_transaction(**kw))
+
+        client.post("/score", json=make_request())
+        client.post("/score", json=make_request())
+
+        assert len(scored) == 2
+
+    def test_non_allow_decisions_are_not_cached(self, client, engine):
+        """Test review decisions bypass the cache."""
+        engine.low_risk_threshold = 0.05
+
+        response = client.post("/score", json=make_request()).json()
+
+        assert response["decision"] == "review"
+        assert not handler._score_cache
+
+
+class TestHistory:
+    """Indexed /history filters."""
+
+    def test_filters_match_scored_transactions(self, client):
+        """Test user, merchant and combined filters return matches in scoring order."""
+        for i, (user_id, merchant_id) in enumerate([("usr_a", "mch_1"), ("usr_b", "mch_1"),
+                                                    ("usr_a", "mch_2"), ("usr_a", "mch_1")]):
+            client.post("/score", json=make_request(f"txn_{i}", user_id=user_id, merchant_id=merchant_id))
+
+        def ids(**params):
+            return [h["transaction_id"] for h in client.get("/history", params=params).json()["transactions"]]
+
+        assert ids(user_id="usr_a") == ["txn_0", "txn_2", "txn_3"]
+        assert ids(merchant_id="mch_1") == ["txn_0", "txn_1", "txn_3"]
+        assert ids(user_id="usr_a", merchant_id="mch_1") == ["txn_0", "txn_3"]
+        assert ids(user_id="usr_a", limit=2) == ["txn_2", "txn_3"]
+        assert ids(user_id="usr_missing") == []
+        assert client.get("/history", params={"user_id": "usr_a", "limit": 1}).json()["total"] == 3
+
+    def test_rescored_under_new_owner_keeps_slot(self, client):
+        """Test a transaction re-scored for another user moves index but keeps its history slot."""
+        client.post("/score", json=make_request("txn_0", user_id="usr_a"))
+        client.post("/score", json=make_request("txn_1", user_id="usr_b"))
+        client.post("/score", json=make_request("txn_0", user_id="usr_b"))
+
+        def ids(**params):
+            return [h["transaction_id"] for h in client.get("/history", params=params).json()["transactions"]]
+
+        assert ids() == ["txn_0", "txn_1"]
+        assert ids(user_id="usr_b") == ["txn_0", "txn_1"]
+        assert ids(user_id="usr_a") == []
+        assert "usr_a" not in handler.metrics.user_index
+
+
+class TestMetricsWindow:
+    """Ring-buffer risk and latency statistics."""
+
+    def test_statistics_cover_the_latest_window(self, monkeypatch):
+        """Test average and p95 only see the last METRICS_WINDOW decisions."""
+        monkeypatch.setattr(handler, "METRICS_WINDOW", 4)
+        metrics = handler.APIMetrics()
+        assert metrics.get_p95_latency() == 0.0
+        assert metrics.get_avg_risk_score() == 0.0
+
+        for i in range(1, 11):
+            metrics.record_decision("allow", i / 10, float(i))
+
+        assert metrics.total_decisions == 10
+        assert metrics.get_p95_latency() == 10.0
+        assert metrics.get_avg_risk_score() == pytest.approx(0.85)
+
+
+class TestBatchScore:
+    """Batch scoring responses."""
+
+    def test_ndjson_stream_matches_json(self, client, monkeypatch):
+        """Test the NDJSON stream carries the same decisions, in request order across slices."""
+        monkeypatch.setattr(handler, "SCORING_WORKERS", 3)
+        monkeypatch.setattr(handler, "BATCH_SLICE_MIN", 1)
+        requests = [make_request(f"txn_{i}", user_country=["US", "GB"][i % 2]) for i in range(150)]
+
+        body = client.post("/batch-score", json=requests).json()
+        streamed = client.post("/batch-score", json=requests, headers={"Accept": "application/x-ndjson"})
+
+        assert streamed.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in streamed.text.splitlines()]
+        assert body["count"] == 150
+        assert lines == body["decisions"]
+        assert [line["transaction_id"] for line in lines] == [f"txn_{i}" for i in range(150)]
+
+    def test_batch_logs_each_decision_separately(self, client, engine, monkeypatch):
+        """Test batch decisions match /score and each gets its own compliance entry."""
+        logged = []
+        monkeypatch.setattr(engine, "_log_compliance", lambda decision, *args: logged.append(decision))
+        requests = [make_request(f"txn_{i}", user_country=["US", "GB"][i % 2]) for i in range(4)]
+
+        body = client.post("/batch-score", json=requests).json()
+
+        assert len({d.compliance_log_id for d in logged}) == 4
+        for request, decision in zip(requests, body["decisions"]):
+            single = client.post("/score", json=request).json()
+            assert decision["decision"] == single["decision"]
+            assert decision["risk_score"] == single["risk_score"]
+            assert decision["reason_codes"] == single["reason_codes"]
+
+    def test_shutdown_stops_scoring_workers(self, engine, monkeypatch):
+        """Test app shutdown stops the worker pool and a restarted app can still batch score."""
+        monkeypatch.setattr(handler, "_scoring_pool", handler.ThreadPoolExecutor(max_workers=1))
+        requests = [make_request(f"txn_{i}") for i in range(3)]
+
+        with TestClient(handler.app) as client:
+            assert client.post("/batch-score", json=requests).json()["count"] == 3
+            pool = handler._scoring_pool
+
+        assert pool._shutdown
+        assert handler._scoring_pool is not pool
+        with TestClient(handler.app) as client:
+            assert client.post("/batch-score", json=requests).json()["count"] == 3
@@ -76,6 +76,13 @@ class TestRiskDecisionEngine:
         assert len(decision.reason_codes) > 0
         assert all(isinstance(code, str) for code in decision.reason_codes)
 
+    def test_simulated_features_are_read_only(self, engine):
+        """Test the shared feature-store snapshots cannot be mutated through a decision."""
+        features = engine._enrich_features({"id": "txn_1"}, {}, None, None, None)
+
+        with pytest.raises(TypeError):
+            features["velocity_features"]["user_txn_count_1h"] = 100
+
 
 class TestEntityGraph:
     """Test suite for entity graph analysis."""